@@ -0,0 +1,71 @@
+"""
+Side-by-side timing of the two fetch engines (pd.read_sql vs. Arrow).
+
+Runs each SQL file once per engine with the query cache disabled and prints
+the wall time and the memory of the resulting DataFrame:
+
+    python -m benchmarks.fetch_engines get_skus.sql get_article_price.sql
+    python -m benchmarks.fetch_engines --backend sqlite --db-dir data/snapshot
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+ENGINES = ['pandas', 'arrow']
+
+def run_benchmark(sql_files, repeat=1):
+    """{sql_file: {engine: (best seconds, rows, deep memory bytes)}}"""
+    from src.database import execute_query, read_sql_query, set_fetch_engine
+
+    results = {}
+    for sql_file in sql_files:
+        query = read_sql_query(sql_file)
+        results[sql_file] = {}
+        for engine in ENGINES:
+            set_fetch_engine(engine)
+            best, df = None, None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                df = execute_query(query)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[sql_file][engine] = (best, len(df), int(df.memory_usage(deep=True).sum()))
+    return results
+
+def print_report(results):
+    print("\n=== Fetch Engine Benchmark ===")
+    print(f"{'SQL file':<40} {'engine':<7} {'seconds':>8} {'rows':>9} {'MB':>8}")
+    for sql_file, engines in results.items():
+        for engine, (seconds, rows, memory) in engines.items():
+            print(f"{sql_file[:40]:<40} {engine:<7} {seconds:>8.2f} {rows:>9} {memory / 1e6:>8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the pandas and Arrow fetch engines.')
+    parser.add_argument('sql_files', nargs='*', help='SQL files in sql/ (default: all files without placeholders)')
+    parser.add_argument('--backend', choices=['access', 'sqlite'], help='Query backend (default: IMPORTER_BACKEND or access)')
+    parser.add_argument('--db-dir', help='Directory with the SQLite copies of the MDB files (sqlite backend)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per file and engine (best is reported)')
+    args = parser.parse_args()
+
+    if args.db_dir:
+        # Read by src.config on import
+        os.environ['IMPORTER_LOCAL_DB_DIR'] = str(Path(args.db_dir).resolve())
+
+    from src.database import set_backend, close_all_connections
+    from src.query_cache import set_cache_enabled
+    from src.sql_registry import sql_registry
+
+    if args.backend:
+        set_backend(args.backend)
+    set_cache_enabled(False)
+    sql_files = args.sql_files or [name for name in sql_registry.names()
+                                   if not sql_registry.get(name).placeholders]
+    try:
+        results = run_benchmark(sql_files, args.repeat)
+    finally:
+        close_all_connections()
+    print_report(results)
@@ -0,0 +1,70 @@
+"""
+End-to-end timing of the src.main pipeline.
+
+Runs the process_* stages of src.main against a query backend and prints the
+wall time per stage. With the sqlite backend this runs on Linux against the
+SQLite copies of the MDB files (db_Artikel_Export2.sqlite, DATEN.sqlite) in
+LOCAL_DB_DIR, e.g. a snapshot copied over from a Windows machine:
+
+    python -m benchmarks.pipeline --db-dir /path/to/snapshot
+    python -m benchmarks.pipeline --stages sku article --repeat 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+STAGES = ['sku', 'article', 'order', 'stock', 'business_partner']
+
+def run_benchmark(stages, repeat=1):
+    """Run the selected stages repeat times and return {stage: [seconds, ...]}"""
+    from src import main as pipeline
+
+    timings = {stage: [] for stage in stages}
+    for _ in range(repeat):
+        for stage in stages:
+            start = time.perf_counter()
+            getattr(pipeline, f"process_{stage}_data")()
+            timings[stage].append(time.perf_counter() - start)
+    return timings
+
+def print_report(timings):
+    print("\n=== Pipeline Benchmark ===")
+    total = 0.0
+    for stage, runs in timings.items():
+        best = min(runs)
+        total += best
+        print(f"{stage:<18} best {best:8.2f}s   mean {sum(runs) / len(runs):8.2f}s   ({len(runs)} run(s))")
+    print(f"{'total (best)':<18}      {total:8.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time the src.main pipeline stages end to end.')
+    parser.add_argument('--backend', default='sqlite', choices=['access', 'sqlite'], help='Query backend (default: sqlite)')
+    parser.add_argument('--db-dir', help='Directory with the SQLite copies of the MDB files (default: LOCAL_DB_DIR)')
+    parser.add_argument('--stages', nargs='*', choices=STAGES, default=STAGES, help='Stages to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per stage')
+    parser.add_argument('--cache', action='store_true', help='Allow query cache hits (default: always query the backend)')
+    parser.add_argument('--json', help='Also write the timings to this JSON file')
+    args = parser.parse_args()
+
+    if args.db_dir:
+        # Read by src.config on import
+        os.environ['IMPORTER_LOCAL_DB_DIR'] = str(Path(args.db_dir).resolve())
+
+    from src.database import set_backend, close_all_connections, print_connection_summary
+    from src.query_cache import set_cache_enabled
+
+    set_backend(args.backend)
+    set_cache_enabled(args.cache)
+    try:
+        timings = run_benchmark(args.stages, args.repeat)
+    finally:
+        print_connection_summary()
+        close_all_connections()
+    print_report(timings)
+    if args.json:
+        Path(args.json).write_text(json.dumps({'backend': args.backend, 'timings': timings}, indent=2), encoding='utf-8')
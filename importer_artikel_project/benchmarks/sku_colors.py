@@ -0,0 +1,94 @@
+"""
+Timing of the SKU colour rewrite on a synthetic SKU column.
+
+Compares rewrite_sku_colors with the former row-wise implementation
+(Series.apply + DataFrame.apply(axis=1)), checks that both produce the same
+file content and prints the wall time of each:
+
+    python -m benchmarks.sku_colors
+    python -m benchmarks.sku_colors --rows 200000 --skip-rowwise
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+COLORS = ['Navy', 'Red', 'White', 'Black', 'Heather Grey', 'Bottle Green', 'Royal', 'Sand', 'Weiß', 'Light-Blue']
+
+def synthetic_skus(rows, seed=0):
+    """SKUs like 'A1234-Navy/White-XL' (some without colour segment, some missing)"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    aids = pd.Series(rng.integers(1000, 99999, rows)).map('A{}'.format)
+    colors = pd.Series(np.array(COLORS, dtype=object)[rng.integers(0, len(COLORS), rows)])
+    second = pd.Series(np.array(['', '/White', '/Navy '], dtype=object)[rng.integers(0, 3, rows)])
+    sizes = pd.Series(np.array(['S', 'M', 'L', 'XL', '2XL-Long'], dtype=object)[rng.integers(0, 5, rows)])
+    skus = aids + '-' + colors + second + '-' + sizes
+    skus[rng.random(rows) < 0.02] = aids          # no colour segment
+    skus[rng.random(rows) < 0.01] = None          # empty cell
+    return skus.astype(str)
+
+def color_map():
+    """ewFarben (lower case) -> ERP_Farben, as read from tArtFarben"""
+    return {'navy': 'NAVY', 'red': 'ROT', 'white': 'WEISS', 'heather grey': 'Heather-Grey', 'weiß': 'WEISS'}
+
+def rowwise_rewrite(skus, mapping):
+    """The former implementation of process_colors, kept as the reference"""
+    import pandas as pd
+    from src.sku_color_processor import extract_color
+
+    sku_df = pd.DataFrame({'aid': skus})
+    sku_df['temp_color'] = sku_df['aid'].apply(extract_color)
+    sku_df['new_color'] = sku_df['temp_color'].map(mapping).fillna(sku_df['temp_color'])
+
+    def process_sku(row):
+        if not isinstance(row['aid'], str) or pd.isna(row['temp_color']) or pd.isna(row['new_color']):
+            return row['aid']
+        parts = row['aid'].split('-')
+        if len(parts) < 3:
+            return row['aid']
+        color_part = parts[1].split('/')[0].strip()
+        if row['temp_color'] != row['new_color']:
+            color_part = row['new_color']
+        parts[1] = color_part.replace('-', '')
+        return '-'.join(parts)
+
+    return sku_df.apply(process_sku, axis=1)
+
+def run_benchmark(rows, rowwise=True):
+    """{implementation: seconds}; raises AssertionError if the outputs differ"""
+    from src.sku_color_processor import rewrite_sku_colors
+
+    skus = synthetic_skus(rows)
+    mapping = color_map()
+    results = {}
+
+    start = time.perf_counter()
+    vectorized = rewrite_sku_colors(skus, mapping)
+    results['vectorized'] = time.perf_counter() - start
+
+    if rowwise:
+        start = time.perf_counter()
+        reference = rowwise_rewrite(skus, mapping)
+        results['row-wise'] = time.perf_counter() - start
+        # compared as written by save_fetcsv (missing values become empty cells)
+        if not vectorized.fillna('').astype(str).equals(reference.fillna('').astype(str)):
+            raise AssertionError("rewrite_sku_colors differs from the row-wise implementation")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time the SKU colour rewrite.')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='SKUs in the synthetic column')
+    parser.add_argument('--skip-rowwise', action='store_true', help='Only time the vectorized rewrite')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, rowwise=not args.skip_rowwise)
+    print(f"\n=== SKU Colour Rewrite ({args.rows} rows) ===")
+    for name, seconds in results.items():
+        print(f"{name:<11} {seconds:>8.2f}s")
+    if 'row-wise' in results:
+        print(f"speed-up    {results['row-wise'] / results['vectorized']:>8.1f}x (outputs identical)")
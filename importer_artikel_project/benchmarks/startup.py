@@ -0,0 +1,56 @@
+"""
+Startup-time guard for the importer.
+
+Measures, in fresh interpreters, how long it takes until work can start:
+importing src.main, and importing src.main plus creating the importer of one
+small stage (config, database layer, pandas and the diff lookup included).
+Exits with status 1 if the median of a scenario exceeds its budget:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --budget 0.8
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Scenario name -> (code run in a fresh interpreter, default budget in seconds)
+SCENARIOS = {
+    'import src.main': ("import src.main", 0.3),
+    'stock stage ready': (
+        "import src.main\n"
+        "from src.stock_importer_class import StockImporter\n"
+        "StockImporter()", 1.0),
+}
+
+def time_scenario(code, runs):
+    """Wall time of each run of code in a new interpreter, in seconds"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, check=True,
+                       stdout=subprocess.DEVNULL, env=dict(os.environ))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check that the importer starts up within its time budget.')
+    parser.add_argument('--runs', type=int, default=5, help='Interpreter starts per scenario')
+    parser.add_argument('--budget', type=float, help='Budget in seconds for the stage scenario (default: 1.0)')
+    args = parser.parse_args()
+
+    failed = False
+    print("=== Startup Benchmark ===")
+    for name, (code, budget) in SCENARIOS.items():
+        if args.budget and name != 'import src.main':
+            budget = args.budget
+        median = statistics.median(time_scenario(code, args.runs))
+        ok = median <= budget
+        failed |= not ok
+        print(f"{'[OK]' if ok else '[FAIL]':<7} {name:<20} median {median:.3f}s (budget {budget:.2f}s)")
+    sys.exit(1 if failed else 0)
@@ -1,5 +1,5 @@
+from functools import lru_cache
 from pathlib import Path
-from src.comparison import compare_columns
 from src.config import DATA_DIR, OUTPUT_DIR
 
 # Define paths
@@ -8,47 +8,60 @@ INPUT_FILE1 = DATA_DIR / "comparison_artbasis.csv"
 INPUT_FILE2 = DATA_DIR / "comparison_lager.csv"
 COMPARISON_OUTPUT_DIR = OUTPUT_DIR / "comparison_results"
 
-# Ensure output directory exists
-COMPARISON_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-# Run comparison
-try:
-    #compare SKU
-    diff, result_file = compare_columns(
-        file_path=INPUT_FILE,
-        col1="aid_ew",
-        col2="aid_erp",
-        output_dir=COMPARISON_OUTPUT_DIR,
-        output_filename="sku_differences.csv",
-        delimiter=',',
-        encoding='windows-1252'
-    )
-    print(f"Found {len(diff)} differences")
-    print(f"Results saved to: {result_file}")
-    #compare ArtBasis
-    diff1, result_file1 = compare_columns(
-        file_path=INPUT_FILE1,
-        col1="aid_ew",
-        col2="aid_erp",
-        output_dir=COMPARISON_OUTPUT_DIR,
-        output_filename="artbasis_differences.csv",
-        delimiter=',',
-        encoding='windows-1252'
-    )
-    print(f"Found {len(diff1)} differences")
-    print(f"Results saved to: {result_file1}")
-    #compare Lager areas
-    diff_areas, result_file2 = compare_columns(
-        file_path=INPUT_FILE2,
-        col1="area_ew",
-        col2="area_erp",
-        output_dir=COMPARISON_OUTPUT_DIR,
-        output_filename="lager_areas_differences.csv",
-        delimiter=',',
-        encoding='windows-1252'
-    )
-    print(f"Found {len(diff_areas)} differences")
-    print(f"Results saved to: {result_file2}")
-except Exception as e:
-    print(f"Error: {e}")
-    raise
+# Diff name -> (input file, column in Megaliste, column in ERP, report file)
+COMPARISONS = {
+    'diff': (INPUT_FILE, "aid_ew", "aid_erp", "sku_differences.csv"),            # compare SKU
+    'diff1': (INPUT_FILE1, "aid_ew", "aid_erp", "artbasis_differences.csv"),     # compare ArtBasis
+    'diff_areas': (INPUT_FILE2, "area_ew", "area_erp", "lager_areas_differences.csv"),  # compare Lager areas
+}
+
+@lru_cache(maxsize=None)
+def load_diff(name):
+    """
+    Values of one comparison (see COMPARISONS) without writing a report.
+    Computed once per process; None if the comparison file does not exist.
+    """
+    from src.comparison import find_differences
+
+    file_path, col1, col2, _ = COMPARISONS[name]
+    if not Path(file_path).exists():
+        return None
+    return find_differences(file_path, col1, col2, delimiter=',', encoding='windows-1252')
+
+def __getattr__(name):
+    # Keeps 'from run_comparison_standalone import diff' working: the diff is
+    # loaded on first access instead of as a side effect of the import
+    if name in COMPARISONS:
+        return load_diff(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def run_comparisons():
+    """Run all comparisons and save the difference reports"""
+    from src.comparison import compare_columns
+
+    # Ensure output directory exists
+    COMPARISON_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    for name, (file_path, col1, col2, output_filename) in COMPARISONS.items():
+        diff, result_file = compare_columns(
+            file_path=file_path,
+            col1=col1,
+            col2=col2,
+            output_dir=COMPARISON_OUTPUT_DIR,
+            output_filename=output_filename,
+            delimiter=',',
+            encoding='windows-1252'
+        )
+        print(f"Found {len(diff)} differences")
+        print(f"Results saved to: {result_file}")
+        results[name] = diff
+    return results
+
+if __name__ == "__main__":
+    # Run comparison
+    try:
+        run_comparisons()
+    except Exception as e:
+        print(f"Error: {e}")
+        raise
@@ -1,3 +1,4 @@
+-- @types ArtikelCode=string, Preis=float64
 SELECT sp.* 
 FROM t_Art_VK_SKU sp
 
@@ -1,3 +1,4 @@
+-- @types aid=string, basis=string
 SELECT 
                 sku.ArtikelCode AS aid,
                 m.ArtBasis AS basis,
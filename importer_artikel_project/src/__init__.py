@@ -1,5 +1,10 @@
 __version__ = "0.1.0"
 
-from .comparison import compare_columns
-
 __all__ = ['compare_columns']
+
+def __getattr__(name):
+    # Imported on first use so 'import src.<module>' does not pull in pandas
+    if name == 'compare_columns':
+        from .comparison import compare_columns
+        return compare_columns
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
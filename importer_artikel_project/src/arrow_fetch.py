@@ -0,0 +1,146 @@
+"""
+Arrow fetch engine for the data layer.
+
+Reads result sets column-wise into pyarrow RecordBatches instead of going
+through pd.read_sql (Python row tuples plus per-column dtype inference):
+
+- Access backend with the optional arrow-odbc package installed: the ODBC
+  driver fills Arrow buffers directly (no Python objects per value).
+- Otherwise (no arrow-odbc, SQLite backend): cursor.fetchmany, converted
+  column by column with pyarrow.
+
+Column types can be declared per SQL file with a comment line, e.g.
+
+    -- @types aid=string, Preis=float64
+
+Declared columns are cast to that type, all others keep the inferred one.
+Enable with IMPORTER_FETCH_ENGINE=arrow or 'python -m src.main --fetch-engine arrow'.
+"""
+import time
+
+ARROW_TYPES = {
+    'string': lambda pa: pa.string(),
+    'int32': lambda pa: pa.int32(),
+    'int64': lambda pa: pa.int64(),
+    'float64': lambda pa: pa.float64(),
+    'bool': lambda pa: pa.bool_(),
+    'date': lambda pa: pa.date32(),
+    'timestamp': lambda pa: pa.timestamp('us'),
+}
+
+_arrow_odbc_checked = None
+
+def arrow_odbc_available():
+    global _arrow_odbc_checked
+    if _arrow_odbc_checked is None:
+        try:
+            import arrow_odbc  # noqa: F401
+            _arrow_odbc_checked = True
+        except ImportError:
+            _arrow_odbc_checked = False
+    return _arrow_odbc_checked
+
+def resolve_types(declared):
+    """{column: type name} from a SQL file declaration -> {column: pyarrow type}"""
+    import pyarrow as pa
+
+    types = {}
+    for column, name in (declared or {}).items():
+        factory = ARROW_TYPES.get(name.lower())
+        if factory is None:
+            print(f"Warning: Unknown column type '{name}' for {column}, type is inferred instead")
+            continue
+        types[column] = factory(pa)
+    return types
+
+def _to_array(values, arrow_type=None):
+    """Column values -> pyarrow Array (inferred first, then cast to the declared type)"""
+    import pyarrow as pa
+
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed Python types in one column: keep them as text
+        array = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+    if arrow_type is not None and array.type != arrow_type:
+        try:
+            array = array.cast(arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            print(f"Warning: Could not cast column to {arrow_type}: {e}")
+    return array
+
+def _empty_batch(columns, types, source_types=None):
+    """Zero-row batch with the result columns (declared type, else source type, else null)"""
+    import pyarrow as pa
+
+    source_types = source_types or [pa.null()] * len(columns)
+    arrays = [pa.array([], type=types.get(name, source)) for name, source in zip(columns, source_types)]
+    return pa.RecordBatch.from_arrays(arrays, names=columns)
+
+def cast_batch(batch, types):
+    """Apply declared column types to a RecordBatch"""
+    import pyarrow as pa
+
+    if not types or not any(name in types for name in batch.schema.names):
+        return batch
+    arrays = []
+    for name, array in zip(batch.schema.names, batch.columns):
+        target = types.get(name)
+        arrays.append(array.cast(target) if target is not None and array.type != target else array)
+    return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+def iter_odbc_batches(connection_string, sql, params, chunksize, types, timings):
+    """RecordBatches straight from the ODBC driver via arrow-odbc"""
+    from arrow_odbc import read_arrow_batches_from_odbc
+
+    start = time.perf_counter()
+    reader = read_arrow_batches_from_odbc(
+        query=sql,
+        connection_string=connection_string,
+        batch_size=chunksize,
+        parameters=[None if p is None else str(p) for p in params] if params else None,
+    )
+    timings['execute'] += time.perf_counter() - start
+    empty = True
+    while True:
+        start = time.perf_counter()
+        batch = next(reader, None)
+        timings['fetch'] += time.perf_counter() - start
+        if batch is None:
+            break
+        empty = False
+        yield cast_batch(batch, types)
+    if empty:
+        # Keep the columns of an empty result
+        yield _empty_batch(reader.schema.names, types, reader.schema.types)
+
+def iter_cursor_batches(cursor, sql, params, chunksize, types):
+    """RecordBatches built column-wise from cursor.fetchmany"""
+    import pyarrow as pa
+
+    cursor.arraysize = chunksize
+    if params is not None:
+        cursor.execute(sql, params)
+    else:
+        cursor.execute(sql)
+    columns = [col[0] for col in cursor.description]
+    empty = True
+    while True:
+        rows = cursor.fetchmany(chunksize)
+        if not rows:
+            break
+        empty = False
+        values = list(zip(*rows))
+        arrays = [_to_array(list(col), types.get(name)) for name, col in zip(columns, values)]
+        yield pa.RecordBatch.from_arrays(arrays, names=columns)
+    if empty:
+        yield _empty_batch(columns, types)
+
+def to_frame(data):
+    """Arrow Table / RecordBatch -> Arrow-backed DataFrame"""
+    import pandas as pd
+
+    if not hasattr(pd, 'ArrowDtype'):
+        # pandas < 1.5 has no Arrow-backed dtypes
+        return data.to_pandas()
+    return data.to_pandas(types_mapper=pd.ArrowDtype)
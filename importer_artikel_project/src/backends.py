@@ -0,0 +1,94 @@
+"""
+Query backends for the importers.
+
+The importers always speak Access SQL. A backend knows how to open a
+connection for one source MDB file and how to translate the SQL for its
+engine:
+
+    access  - the MDB files through the Access ODBC driver (Windows, default)
+    sqlite  - one SQLite file per MDB in LOCAL_DB_DIR, e.g. the snapshot
+              written by 'python -m src.snapshot'; runs on Linux
+
+Select one with IMPORTER_BACKEND=<name> or 'python -m src.main --backend <name>'.
+"""
+import sqlite3
+from pathlib import Path
+from src.config import LOCAL_DB_DIR, get_connection_string
+
+class QueryBackend:
+    """Base class: connection factory plus SQL translation for one engine"""
+
+    name = None
+    # Whether diff keys can be joined from Text ISAM key files (see database.stage_keys)
+    supports_key_files = False
+
+    @property
+    def errors(self):
+        """Exception types after which a pooled connection must be discarded"""
+        return ()
+
+    def source_path(self, mdb_path):
+        """File the connections for mdb_path actually read from"""
+        return Path(mdb_path)
+
+    def connect(self, mdb_path):
+        raise NotImplementedError
+
+    def translate(self, sql):
+        """Rewrite Access SQL for this engine"""
+        return sql
+
+    def odbc_connection_string(self, mdb_path):
+        """ODBC connection string for direct Arrow fetches (None: not an ODBC source)"""
+        return None
+
+class AccessBackend(QueryBackend):
+    """The MDB files themselves, through the Access ODBC driver"""
+
+    name = 'access'
+    supports_key_files = True
+
+    @property
+    def errors(self):
+        import pyodbc
+        return (pyodbc.Error,)
+
+    def connect(self, mdb_path):
+        import pyodbc
+        return pyodbc.connect(get_connection_string(mdb_path))
+
+    def odbc_connection_string(self, mdb_path):
+        return get_connection_string(mdb_path)
+
+class SQLiteBackend(QueryBackend):
+    """Local SQLite copies of the MDB files with Access function shims"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_dir=None):
+        self.db_dir = Path(db_dir or LOCAL_DB_DIR)
+
+    @property
+    def errors(self):
+        return (sqlite3.Error,)
+
+    def source_path(self, mdb_path):
+        from src.snapshot import snapshot_path
+        return snapshot_path(mdb_path, self.db_dir)
+
+    def connect(self, mdb_path):
+        from src.snapshot import connect_snapshot
+        return connect_snapshot(mdb_path, self.db_dir)
+
+    def translate(self, sql):
+        from src.sql_dialect import translate_access_sql
+        return translate_access_sql(sql)
+
+BACKENDS = {backend.name: backend for backend in (AccessBackend, SQLiteBackend)}
+
+def get_backend(name):
+    """Create the backend registered under name"""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown query backend '{name}' (available: {', '.join(BACKENDS)})")
@@ -1,8 +1,125 @@
 
 import pandas as pd
+from functools import partial
 from pathlib import Path
-from src.database import execute_query, save_fetcsv
+from src.database import execute_query, execute_query_by_keys, save_fetcsv
 from src.config import OUTPUT_DIR, SQL_DIR
+from src.sql_registry import sql_registry
+from src.parallel import shard_map
+
+def _resolve_bank_details(df, blz_bic_map, blz_name_map):
+    """iban, swiftbic, bankname and bankcountry for accounting rows (runs in shard_map workers)"""
+    # --- Resolve IBAN from mixed BLZ/BIC and Kontonummer/IBAN fields ---
+    #
+    # Real-world data combinations:
+    #   Case 1: BLZ (8 digits) + Kontonummer (digits)  → calculate IBAN
+    #   Case 2: BLZ (8 digits) + any valid IBAN        → use IBAN from accountno
+    #   Case 3: BIC (letters)  + any valid IBAN        → use IBAN from accountno
+    #   Case 4: BIC (letters)  + Kontonummer (digits)  → cannot resolve, leave empty
+    import re as _re
+    _iban_pattern = _re.compile(r'^[A-Z]{2}[0-9]{2}[A-Z0-9]{10,}$')
+    _bic_pattern  = _re.compile(r'^[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}([A-Z0-9]{3})?$')
+
+    def _clean_alphanum(val):
+        """Strip all non-alphanumeric characters and uppercase."""
+        return _re.sub(r'[^A-Za-z0-9]', '', str(val).strip()).upper() if pd.notna(val) else ''
+
+    def resolve_iban(bankcode_val, accountno_val):
+        blz   = str(bankcode_val).strip() if pd.notna(bankcode_val) else ''
+        konto = _clean_alphanum(accountno_val)  # Improvement 1: clean whitespace/dashes
+
+        # Improvement 2: accept any valid IBAN (not just German DE) → covers Cases 2 & 3
+        if _iban_pattern.match(konto):
+            return konto
+
+        # BLZ is an 8-digit bank code → calculate German IBAN (Case 1)
+        if blz and blz[0].isdigit():
+            return BusinessPartnerImporter.calculate_german_iban(blz, konto)
+
+        # BIC + Kontonummer → cannot resolve IBAN (Case 4)
+        return ''
+
+    df['iban'] = df.apply(lambda row: resolve_iban(row.get('bankcode'), row.get('accountno')), axis=1)
+
+    # Fill bankname using a 3-level fallback chain (defined here, applied after swiftbic is computed)
+    _bic_name_cache = {}
+
+    def resolve_bankname(name_val, bankcode_val, bic_val):
+        # Priority 1: use source bankname if available
+        name = str(name_val).strip() if pd.notna(name_val) else ''
+        if name and name.lower() not in ('nan', 'none', ''):
+            return name
+
+        # Priority 2: look up bank name from Bundesbank BLZ registry (numeric BLZ only)
+        blz = str(bankcode_val).strip() if pd.notna(bankcode_val) else ''
+        bb_name = blz_name_map.get(blz, '')
+        if bb_name:
+            return bb_name
+
+        # Priority 3: get bank name from BIC via schwifty (cached per unique BIC)
+        # NOTE: uses swiftbic column which must be computed before calling this
+        bic_key = str(bic_val).strip().upper() if pd.notna(bic_val) else ''
+        if bic_key:
+            if bic_key not in _bic_name_cache:
+                try:
+                    from schwifty import BIC as _BIC
+                    _bic_name_cache[bic_key] = _BIC(bic_key).bank_name or ''
+                except Exception:
+                    _bic_name_cache[bic_key] = ''
+            if _bic_name_cache[bic_key]:
+                return _bic_name_cache[bic_key]
+
+        return ''
+
+
+    # --- Resolve BIC with improved priority chain + caching ---
+    # Improvement 3: cache schwifty calls (same IBAN looked up only once)
+    # Improvement 5: reordered priorities for speed and coverage
+    _bic_cache = {}
+
+    def resolve_bic(iban_val, bankcode_val):
+        blz = str(bankcode_val).strip().upper() if pd.notna(bankcode_val) else ''
+
+        # Priority 1: bankcode is already a valid BIC → instant, no lookup needed
+        if blz and blz[0].isalpha() and _bic_pattern.match(blz):
+            return blz
+
+        # Priority 2: BIC from Bundesbank BLZ registry (offline, authoritative)
+        if blz and blz[0].isdigit():
+            bb_bic = blz_bic_map.get(blz, '')
+            if bb_bic:
+                return bb_bic
+
+        # Priority 3: schwifty IBAN→BIC lookup (cached per unique IBAN value)
+        iban_key = _clean_alphanum(iban_val)
+        if iban_key:
+            if iban_key not in _bic_cache:
+                _bic_cache[iban_key] = BusinessPartnerImporter.calculate_bic_from_iban(iban_key)
+            if _bic_cache[iban_key]:
+                return _bic_cache[iban_key]
+
+        # Priority 4: no BIC resolvable (defunct bank or missing data)
+        return ''
+
+    df['swiftbic'] = df.apply(lambda row: resolve_bic(row.get('iban'), row.get('bankcode')), axis=1)
+
+    # Now apply bankname fallback (after swiftbic is computed so Priority 3 can use it)
+    df['bankname'] = df.apply(
+        lambda row: resolve_bankname(row.get('bankname'), row.get('bankcode'), row.get('swiftbic')), axis=1
+    )
+
+    # Derive bank country from IBAN (first 2 chars) with fallback to BIC (chars 4-5)
+    def get_bank_country(iban_val, bic_val):
+        iban = str(iban_val).strip().upper() if iban_val else ''
+        if len(iban) >= 2 and iban[:2].isalpha():
+            return iban[:2]
+        bic = str(bic_val).strip().upper() if bic_val else ''
+        if len(bic) >= 6 and bic[4:6].isalpha():
+            return bic[4:6]
+        return ''
+
+    df['bankcountry'] = df.apply(lambda row: get_bank_country(row.get('iban'), row.get('swiftbic')), axis=1)
+    return df
 
 class BusinessPartnerImporter:
     """
@@ -31,37 +148,45 @@ class BusinessPartnerImporter:
         return {str(pid) for pid in ids} if ids else None
 
     def _load_query(self, filename):
-        """Helper to safely load SQL query from file"""
-        sql_path = self.sql_dir / filename
-        if not sql_path.exists():
-            print(f"Warning: SQL file not found at {sql_path}")
-            # Create placeholder if missing (replicating original logic)
-            with open(sql_path, 'w', encoding='utf-8') as f:
-                f.write("SELECT * FROM tAdressen")
-            print(f"Created placeholder SQL file at {sql_path}")
-            
-        return sql_path.read_text(encoding='utf-8')
+        """Helper to get a parsed SQL query from the registry"""
+        template = sql_registry.get(filename)
+        if template is None:
+            # Fall back to the plain address table (nothing is written to sql/)
+            print(f"Warning: SQL file not found at {self.sql_dir / filename}, using SELECT * FROM tAdressen")
+            return "SELECT * FROM tAdressen"
+        return template.text
+
+    def _fetch_data(self, sql_filename, key_col=None):
+        """
+        Execute a query; with key_col (a column of its result) restricted to the diff IDs,
+        joined in the database and re-checked in Python. key_col=None exports all rows.
 
-    def _fetch_data(self, sql_filename, filter_col='AdrId'):
-        """Common logic to execute query and filter by IDs"""
+        Only the tOrderAdr queries name their key 'AdrId'. The tAdressen queries return
+        'AdrID' and were never restricted by the diff filter (it compared the column name
+        case-sensitively), so they keep exporting every row.
+        """
         query = self._load_query(sql_filename)
-        df = pd.DataFrame(execute_query(query))
+        if key_col is None:
+            return execute_query(query)
+        df = execute_query_by_keys(query, self.diff_ids, f"CStr(q.{key_col})")
         
         if df.empty:
             return df
 
-        if self.diff_ids and filter_col in df.columns:
+        if self.diff_ids and key_col in df.columns:
             print(f"Filtering {len(self.diff_ids)} records")
-            df[filter_col] = df[filter_col].astype(str)
-            df = df[df[filter_col].isin(self.diff_ids)]
+            df[key_col] = df[key_col].astype(str)
+            df = df[df[key_col].isin(self.diff_ids)]
             
         return df
 
     def _save_csv(self, df, filename, data_type="BUSINESS_PARTNER"):
-        """Standardized CSV export with FETCSV header"""
+        """Standardized CSV export with FETCSV header; None if nothing (new) was written"""
         if df is not None and not df.empty:
             out_path = self.output_dir / filename
-            save_fetcsv(df, out_path, data_type)
+            if save_fetcsv(df, out_path, data_type) == 'unchanged':
+                print(f"Unchanged: {out_path.name} ({len(df)} records), not handed off again")
+                return None
             print(f"Exported {len(df)} records to: {out_path}")
             return out_path
         return None
@@ -198,38 +323,6 @@ class BusinessPartnerImporter:
         cols = ['customer_id', 'company', 'name1', 'name2',
                 'bankname', 'bankcode', 'bankplace', 'bankcountry', 'iban', 'swiftbic', 'accountno']
         
-        # --- Resolve IBAN from mixed BLZ/BIC and Kontonummer/IBAN fields ---
-        #
-        # Real-world data combinations:
-        #   Case 1: BLZ (8 digits) + Kontonummer (digits)  → calculate IBAN
-        #   Case 2: BLZ (8 digits) + any valid IBAN        → use IBAN from accountno
-        #   Case 3: BIC (letters)  + any valid IBAN        → use IBAN from accountno
-        #   Case 4: BIC (letters)  + Kontonummer (digits)  → cannot resolve, leave empty
-        import re as _re
-        _iban_pattern = _re.compile(r'^[A-Z]{2}[0-9]{2}[A-Z0-9]{10,}$')
-        _bic_pattern  = _re.compile(r'^[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}([A-Z0-9]{3})?$')
-
-        def _clean_alphanum(val):
-            """Strip all non-alphanumeric characters and uppercase."""
-            return _re.sub(r'[^A-Za-z0-9]', '', str(val).strip()).upper() if pd.notna(val) else ''
-
-        def resolve_iban(bankcode_val, accountno_val):
-            blz   = str(bankcode_val).strip() if pd.notna(bankcode_val) else ''
-            konto = _clean_alphanum(accountno_val)  # Improvement 1: clean whitespace/dashes
-
-            # Improvement 2: accept any valid IBAN (not just German DE) → covers Cases 2 & 3
-            if _iban_pattern.match(konto):
-                return konto
-
-            # BLZ is an 8-digit bank code → calculate German IBAN (Case 1)
-            if blz and blz[0].isdigit():
-                return self.calculate_german_iban(blz, konto)
-
-            # BIC + Kontonummer → cannot resolve IBAN (Case 4)
-            return ''
-
-        df['iban'] = df.apply(lambda row: resolve_iban(row.get('bankcode'), row.get('accountno')), axis=1)
-
         # --- Load Bundesbank BLZ registry (city + BIC + bank name from official source) ---
         blz_lookup_path = SQL_DIR.parent / 'data' / 'bundesbank_blz_lookup.csv'
         _required_cols = {'bic', 'bank_name'}
@@ -264,91 +357,14 @@ class BusinessPartnerImporter:
             lambda v: blz_city_map.get(str(v).strip(), '') if pd.notna(v) else ''
         )
 
-        # Fill bankname using a 3-level fallback chain (defined here, applied after swiftbic is computed)
-        _bic_name_cache = {}
-
-        def resolve_bankname(name_val, bankcode_val, bic_val):
-            # Priority 1: use source bankname if available
-            name = str(name_val).strip() if pd.notna(name_val) else ''
-            if name and name.lower() not in ('nan', 'none', ''):
-                return name
-
-            # Priority 2: look up bank name from Bundesbank BLZ registry (numeric BLZ only)
-            blz = str(bankcode_val).strip() if pd.notna(bankcode_val) else ''
-            bb_name = blz_name_map.get(blz, '')
-            if bb_name:
-                return bb_name
-
-            # Priority 3: get bank name from BIC via schwifty (cached per unique BIC)
-            # NOTE: uses swiftbic column which must be computed before calling this
-            bic_key = str(bic_val).strip().upper() if pd.notna(bic_val) else ''
-            if bic_key:
-                if bic_key not in _bic_name_cache:
-                    try:
-                        from schwifty import BIC as _BIC
-                        _bic_name_cache[bic_key] = _BIC(bic_key).bank_name or ''
-                    except Exception:
-                        _bic_name_cache[bic_key] = ''
-                if _bic_name_cache[bic_key]:
-                    return _bic_name_cache[bic_key]
-
-            return ''
-
-
-        # --- Resolve BIC with improved priority chain + caching ---
-        # Improvement 3: cache schwifty calls (same IBAN looked up only once)
-        # Improvement 5: reordered priorities for speed and coverage
-        _bic_cache = {}
-
-        def resolve_bic(iban_val, bankcode_val):
-            blz = str(bankcode_val).strip().upper() if pd.notna(bankcode_val) else ''
-
-            # Priority 1: bankcode is already a valid BIC → instant, no lookup needed
-            if blz and blz[0].isalpha() and _bic_pattern.match(blz):
-                return blz
-
-            # Priority 2: BIC from Bundesbank BLZ registry (offline, authoritative)
-            if blz and blz[0].isdigit():
-                bb_bic = blz_bic_map.get(blz, '')
-                if bb_bic:
-                    return bb_bic
-
-            # Priority 3: schwifty IBAN→BIC lookup (cached per unique IBAN value)
-            iban_key = _clean_alphanum(iban_val)
-            if iban_key:
-                if iban_key not in _bic_cache:
-                    _bic_cache[iban_key] = self.calculate_bic_from_iban(iban_key)
-                if _bic_cache[iban_key]:
-                    return _bic_cache[iban_key]
-
-            # Priority 4: no BIC resolvable (defunct bank or missing data)
-            return ''
-
-        df['swiftbic'] = df.apply(lambda row: resolve_bic(row.get('iban'), row.get('bankcode')), axis=1)
-
-        # Now apply bankname fallback (after swiftbic is computed so Priority 3 can use it)
-        df['bankname'] = df.apply(
-            lambda row: resolve_bankname(row.get('bankname'), row.get('bankcode'), row.get('swiftbic')), axis=1
-        )
-
-        # Derive bank country from IBAN (first 2 chars) with fallback to BIC (chars 4-5)
-        def get_bank_country(iban_val, bic_val):
-            iban = str(iban_val).strip().upper() if iban_val else ''
-            if len(iban) >= 2 and iban[:2].isalpha():
-                return iban[:2]
-            bic = str(bic_val).strip().upper() if bic_val else ''
-            if len(bic) >= 6 and bic[4:6].isalpha():
-                return bic[4:6]
-            return ''
-
-        df['bankcountry'] = df.apply(lambda row: get_bank_country(row.get('iban'), row.get('swiftbic')), axis=1)
+        df = shard_map(partial(_resolve_bank_details, blz_bic_map=blz_bic_map, blz_name_map=blz_name_map), df, 'customer_id')
 
         # Export all records into a single file
         out_cols = [c for c in cols if c in df.columns]
         return self._save_csv(df[out_cols].drop_duplicates(), "BUSINESS_PARTNER_ACCOUNTING.csv")
 
     def import_business_supplier(self):
-        df = self._fetch_data('get_business_supplier.sql')
+        df = self._fetch_data('get_business_supplier.sql', key_col='AdrId')
         if df.empty: return None
 
         rename_map = {
@@ -644,7 +660,7 @@ class BusinessPartnerImporter:
         return results
 
     def import_supplier_address(self):
-        df = self._fetch_data('get_supplier_address.sql')
+        df = self._fetch_data('get_supplier_address.sql', key_col='AdrId')
         if df.empty: return None
 
         rename_map = {
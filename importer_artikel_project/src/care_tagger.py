@@ -0,0 +1,55 @@
+"""
+Section keywords for care instruction texts (Pflegehinweise).
+
+'40 Grad waschen nicht bügeln Keine chemische Reinigung' becomes
+'Waschen: || 40 Grad waschen ||Bügeln: || nicht bügeln || Reinigung: || Keine chemische Reinigung'.
+
+The keyword rules are one ordered table. A rule replaces every occurrence
+of its pattern when the text contains the pattern and does not contain the
+rule's stop marker yet; later rules see the result of earlier ones, so the
+order matters. The rules are applied once per distinct text (most SKUs of
+an article share the same care text) and texts without any pattern skip
+the table entirely.
+"""
+import re
+
+def _buegeln_rules(pattern):
+    """Bügeln rules, one block per spelling of 'mäßig'"""
+    return [
+        ('nicht heiß bügeln', ' ||Bügeln: || nicht heiß bügeln', 'Bügeln:'),
+        ('nicht bügeln', ' ||Bügeln: || nicht bügeln', 'Bügeln:'),
+        ('Bügeln:', ' ||Bügeln: ||', '||Bügeln: ||'),
+        (' Bügeln ', ' ||Bügeln: || ', 'Bügeln:'),
+        (pattern, '||Bügeln: || ' + pattern, 'Bügeln:'),
+    ]
+
+# (pattern, replacement, stop marker)
+CARE_RULES = [
+    ('Keine chemische', '|| Reinigung: || Keine chemische', 'Reinigung:'),
+    (' Trocknen', ' Trocknen: || Trocknen', ' Trocknen:'),
+    *_buegeln_rules('mäßig'),
+    *_buegeln_rules('mässig'),
+    (' Reinigen', ' Reinigen: || Reinigen', ' Reinigen:'),
+]
+
+_ANY_PATTERN = re.compile('|'.join(sorted({re.escape(p) for p, _, _ in CARE_RULES}, key=len, reverse=True)))
+_WHITESPACE = re.compile(r'\s+')
+
+def tag_care_text(text):
+    """Care instruction text with its section keywords"""
+    text = 'Waschen: || ' + text
+    if _ANY_PATTERN.search(text):
+        for pattern, replacement, stop in CARE_RULES:
+            if pattern in text and stop not in text:
+                text = text.replace(pattern, replacement)
+
+    text = _WHITESPACE.sub(' ', text)
+    # literal (non-regex) replacements, kept from the original export
+    text = text.replace('\\|\\|', ' || ').replace('\\s+', ' ').strip()
+    return text.replace(' : ', ': ')
+
+def tag_care_texts(texts):
+    """tag_care_text for a Series of texts, computed once per distinct text"""
+    texts = texts.astype(str)
+    tagged = {text: tag_care_text(text) for text in texts.unique()}
+    return texts.map(tagged)
@@ -0,0 +1,164 @@
+"""
+Classification features for SKU and article exports.
+
+Each feature is declared as (feature name, source column, transform). The
+engine evaluates every transform on whole columns and lays the results out
+as the feature[i] / feature_value[i] pairs of the import format, in the
+order of the spec. A source column missing from the query result gives the
+transform's empty value ('' or 0), as in the old row-by-row code.
+"""
+import numpy as np
+import pandas as pd
+
+def value(df, column):
+    """The column value as is"""
+    return df[column] if column in df.columns else ''
+
+def empty(df, column):
+    """Always empty (feature exists in the format but has no source)"""
+    return ''
+
+def flag(df, column):
+    """Yes/No column as 0/1 (Access stores Yes as -1); missing values are 0"""
+    if column not in df.columns:
+        return 0
+    return pd.to_numeric(df[column]).astype('float64').abs().fillna(0).astype('int64')
+
+def inverse_flag(df, column):
+    """1 - flag, e.g. Kids from the 'erw' (adult) column"""
+    if column not in df.columns:
+        return 0
+    return 1 - flag(df, column)
+
+def _text(df, column):
+    """str() of every value, so missing values read 'nan' / 'None' like the original exports"""
+    return df[column].map(str, na_action=None) if column in df.columns else ''
+
+def prefix2(df, column):
+    """First two characters of the text value (country code from 'DE - Deutschland')"""
+    text = _text(df, column)
+    return text if isinstance(text, str) else text.str[:2]
+
+def prefix4(df, column):
+    """First four characters of the text value, empty when missing"""
+    if column not in df.columns:
+        return ''
+    col = df[column]
+    return _text(df, column).str[:4].where(col.notna(), '')
+
+def without_kinder(df, column):
+    """Text value with 'Kinder' removed (gender 'Kinder Damen' -> ' Damen')"""
+    text = _text(df, column)
+    return text if isinstance(text, str) else text.str.replace('Kinder', '', regex=False)
+
+def yyyymmdd(df, column):
+    """Date value as YYYYMMDD, empty when missing"""
+    if column not in df.columns:
+        return ''
+    col = df[column]
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col.dt.strftime('%Y%m%d').where(col.notna(), '')
+    # Text dates: parse each distinct value on its own, the formats may differ per row
+    dates = {v: pd.to_datetime(v).strftime('%Y%m%d') for v in col.dropna().unique()}
+    return col.map(dates).where(col.notna(), '')
+
+SKU_FEATURES = [
+    ('Grammatur', 'Grammatur', value),
+    ('Oeko_MadeInGreen', 'Oeko_MadeInGreen', value),
+    ('Partnerlook', 'Artikel_Partner', prefix4),
+    ('Sortierung', 'sku_ArtSort', value),
+    ('Fabric_Herstellung', 'Fabric_Herstellung', value),
+    ('Material', 'Zusammensetzung', value),
+    ('Workwear', 'workwear', flag),
+    ('Produktlinie_Veredelung', 'veredelung', flag),
+    ('Produktlinie_Veredelungsart_Discharge', 'discharge', flag),
+    ('Produktlinie_Veredelungsart_DTG', 'dtg', flag),
+    ('Produktlinie_Veredelungsart_DYOJ', 'dyoj', flag),
+    ('Produktlinie_Veredelungsart_DYOP', 'dyop', flag),
+    ('Produktlinie_Veredelungsart_Flock', 'flock', flag),
+    ('Produktlinie_Veredelungsart_Siebdruck', 'siebdruck', flag),
+    ('Produktlinie_Veredelungsart_Stick', 'stick', flag),
+    ('Produktlinie_Veredelungsart_Sublimationsdruck', 'sublimation', flag),
+    ('Produktlinie_Veredelungsart_Transferdruck', 'transfer', flag),
+    ('Brand_Premium_Item', 'premium', flag),
+    ('Extras', 'extras', flag),
+    ('Kids', 'erw', inverse_flag),
+    ('Outdoor', 'outdoor', flag),
+    ('Size_Oversize', 'oversize', flag),
+    ('Geschlecht', 'Gender', without_kinder),
+    ('No_Label', 'No_Label', flag),
+    ('Grad_60', 'Grad_60', flag),
+    ('Colour_Farbe', 'Farbe', value),
+    ('Colour_Farbgruppe', 'Farbgruppe', value),
+    ('Size_Größe', 'Größe', value),
+    ('Size_Größenspiegel', 'Größenspiegel', value),
+    ('Colour_zweifarbig', 'zweifarbig', flag),
+    ('Ursprungsland', 'Ursprungsland', prefix2),
+    ('Fabric_Melange', 'ColorMelange', flag),
+    ('Zolltext_VZTA_aktiv_bis', 'VZTA aktiv bis', yyyymmdd),
+    ('Zolltext_VZTA_aktiv_von', 'VZTA aktiv von', yyyymmdd),
+    ('New_Year', 'newyear', value),
+    ('Special_Offer', 'specialoffer', flag),
+]
+
+ARTIKEL_FEATURES = [
+    ('Grammatur', 'Grammatur', value),
+    ('Oeko_MadeInGreen', None, empty),
+    ('Partnerlook', 'Artikel_Partner', prefix4),
+    ('Sortierung', 'ArtSort', value),
+    ('Fabric_Herstellung', 'Materialart', value),
+    ('Material', 'Zusammensetzung', value),
+    ('Workwear', 'workwear', flag),
+    ('Produktlinie_Veredelung', 'veredelung', flag),
+    ('Produktlinie_Veredelungsart_Discharge', 'discharge', flag),
+    ('Produktlinie_Veredelungsart_DTG', 'dtg', flag),
+    ('Produktlinie_Veredelungsart_DYOJ', 'dyoj', flag),
+    ('Produktlinie_Veredelungsart_DYOP', 'dyop', flag),
+    ('Produktlinie_Veredelungsart_Flock', 'flock', flag),
+    ('Produktlinie_Veredelungsart_Siebdruck', 'siebdruck', flag),
+    ('Produktlinie_Veredelungsart_Stick', 'stick', flag),
+    ('Produktlinie_Veredelungsart_Sublimationsdruck', 'sublimation', flag),
+    ('Produktlinie_Veredelungsart_Transferdruck', 'transfer', flag),
+    ('Brand_Premium_Item', 'premium', flag),
+    ('Extras', 'extras', flag),
+    ('Kids', 'erw', inverse_flag),
+    ('Outdoor', 'outdoor', flag),
+    ('Size_Oversize', 'oversize', flag),
+    ('Geschlecht', 'Gender', value),
+    ('No_Label', 'No_Label', flag),
+    ('Grad_60', 'Grad_60', flag),
+    ('New_Year', 'New_Year', value),
+    ('Special_Offer', 'specialoffer', flag),
+]
+
+def _column(values, index):
+    """Transform result -> column data, inferred like the values of a list of row dicts"""
+    if not isinstance(values, pd.Series):
+        return [values] * len(index)
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biuf':
+        return values.to_numpy()
+    return list(values.to_numpy(dtype=object))  # Arrow/nullable missing values stay pd.NA, as in iterrows()
+
+def build_classification(df, features):
+    """Warengruppensystem classification rows (aid, product group, feature pairs) for df"""
+    data = {
+        'aid': _column(value(df, 'aid'), df.index),
+        'company': 0,
+        'classification_system': 'Warengruppensystem',
+        'product_group': _column(value(df, 'product_group'), df.index),
+        'product_group_superior': _column(_text(df, 'Marke') + '||Produktlinie||ROOT', df.index),
+    }
+    for i, (name, column, transform) in enumerate(features):
+        data[f'feature[{i}]'] = name
+        data[f'feature_value[{i}]'] = _column(transform(df, column), df.index)
+    return pd.DataFrame(data, index=df.index)
+
+def sku_classification(df):
+    """SKU classification rows (runs in shard_map workers)"""
+    if 'aid' not in df.columns:
+        raise KeyError('aid')
+    return build_classification(df, SKU_FEATURES)
+
+def artikel_classification(df):
+    """Article classification rows (runs in shard_map workers)"""
+    return build_classification(df, ARTIKEL_FEATURES)
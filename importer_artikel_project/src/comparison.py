@@ -5,6 +5,30 @@ from datetime import datetime
 import pandas as pd
 from .database import read_csv_file, save_fetcsv
 
+def find_differences(
+    file_path: Path,
+    col1: str,
+    col2: str,
+    delimiter: str = ',',
+    encoding: str = 'windows-1252'
+) -> Set[str]:
+    """Values of col1 that do not occur in col2 (no report is written)"""
+    # Read CSV file using database function
+    df = read_csv_file(
+        file_path=file_path,
+        delimiter=delimiter,
+        encoding=encoding,
+        required_columns=[col1, col2],
+        dtype={col1: str, col2: str}
+    )
+
+    # Process data and convert to lowercase
+    col1_values = df[col1].dropna().astype(str).str.strip()
+    col2_values = df[col2].dropna().astype(str).str.strip()
+
+    # Find differences (case insensitive comparison)
+    return set(col1_values) - set(col2_values)
+
 def compare_columns(
     file_path: Path,
     col1: str,
@@ -18,21 +42,7 @@ def compare_columns(
     logger = logging.getLogger(__name__)
     
     try:
-        # Read CSV file using database function
-        df = read_csv_file(
-            file_path=file_path,
-            delimiter=delimiter,
-            encoding=encoding,
-            required_columns=[col1, col2],
-            dtype={col1: str, col2: str}
-        )
-            
-        # Process data and convert to lowercase
-        col1_values = df[col1].dropna().astype(str).str.strip()
-        col2_values = df[col2].dropna().astype(str).str.strip()
-        
-        # Find differences (case insensitive comparison)
-        diff = set(col1_values) - set(col2_values)
+        diff = find_differences(file_path, col1, col2, delimiter, encoding)
         
         # Create output directory if not exists
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -1,3 +1,5 @@
+import os
+from functools import lru_cache
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -6,12 +8,37 @@ MDB_FILE = DATA_DIR / "db_Artikel_Export2.mdb"
 MDB_DATA = DATA_DIR / "DATEN.MDB"
 OUTPUT_DIR = DATA_DIR / "output"
 SQL_DIR = BASE_DIR / "sql"
+PRICE_ERP_FILE = DATA_DIR / "Price_ERP.csv"  # ERP price export behind the *_validity price lists
+SQL_RECHECK_SECONDS = 2.0  # how often the SQL registry looks for changed files in sql/
+CACHE_DIR = DATA_DIR / "cache"
+SNAPSHOT_DIR = DATA_DIR / "snapshot"
+REPORT_DIR = DATA_DIR / "reports"
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+FETCH_ARRAYSIZE = 10000  # rows per fetchmany() call / DataFrame chunk in iter_query
+AID_BATCH_SIZE = 500  # max AIDs per IN (...) list before a query is split into batches
+QUERY_WORKERS = 4  # concurrent batch queries (each on its own pooled connection)
+KEY_TABLE_DIR = CACHE_DIR / "keys"
+USE_KEY_TABLES = True  # join diff keys inside Access instead of filtering in Python
+QUERY_BACKEND = os.environ.get("IMPORTER_BACKEND", "access")  # see src/backends.py
+PIPELINE_WORKERS = 3  # src.main stages running at the same time
+DEFAULT_STAGES = ["business_partner"]  # stages run by 'python -m src.main' without --stages
+FETCH_ENGINE = os.environ.get("IMPORTER_FETCH_ENGINE", "pandas")  # 'pandas' (pd.read_sql) or 'arrow', see src/arrow_fetch.py
+TRANSFORM_WORKERS = int(os.environ.get("IMPORTER_TRANSFORM_WORKERS", "1"))  # processes for CPU-bound transforms, see src/parallel.py
+TRANSFORM_MIN_ROWS = 20000  # smaller frames are transformed in-process
+WRITE_BUFFER_BYTES = 1024 * 1024  # file buffer of the streaming FETCSV writer (src/fetcsv.py)
+DELTA_MODE = os.environ.get("IMPORTER_DELTA", "0") == "1"  # export only new/changed AIDs, see src/delta.py
+DELTA_DIR = CACHE_DIR / "delta"  # per-AID content hashes of the previous run
+SKIP_UNCHANGED_OUTPUTS = os.environ.get("IMPORTER_SKIP_UNCHANGED", "0") == "1"  # keep files identical to the previous run's, see src/output_manifest.py
+OUTPUT_MANIFEST_FILE = CACHE_DIR / "output_manifest.json"  # content hashes of the last written output files
+DELTA_IGNORE_COLUMNS = ['valid_from', 'valid_to', 'valid_from_text', 'valid_to_text']  # run-date stamps, not content (default; the validity lists pass their own)
+LOCAL_DB_DIR = Path(os.environ.get("IMPORTER_LOCAL_DB_DIR", SNAPSHOT_DIR))  # SQLite files for the sqlite backend
 
 for directory in [OUTPUT_DIR, SQL_DIR, DATA_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
 
-def get_connection_string(mdb_path):
-    """Create a connection string for any .mdb or .accdb file."""
+@lru_cache(maxsize=None)
+def get_access_driver():
+    """Name of the installed Access ODBC driver (looked up once per process)"""
     # Try with the newer driver first, fall back to older if needed
     drivers = [
         "Microsoft Access Driver (*.mdb, *.accdb)",
@@ -20,13 +47,25 @@ def get_connection_string(mdb_path):
     ]
     
     import pyodbc
-    available_drivers = [d for d in drivers if any(d in x for x in pyodbc.drivers())]
+    installed = pyodbc.drivers()
+    available_drivers = [d for d in drivers if any(d in x for x in installed)]
     
     if not available_drivers:
         raise RuntimeError("No suitable Microsoft Access ODBC driver found. Please install 'Microsoft Access Database Engine 2016 Redistributable'")
         
-    return f"DRIVER={{{available_drivers[0]}}};DBQ={mdb_path};"
+    return available_drivers[0]
+
+def get_connection_string(mdb_path):
+    """Create a connection string for any .mdb or .accdb file."""
+    return f"DRIVER={{{get_access_driver()}}};DBQ={mdb_path};"
+
+# Default connection strings, resolved on first access so importing the config
+# does not require pyodbc or an installed Access driver
+_LAZY_CONN_STRS = {"CONN_STR": MDB_FILE, "CONN_STR_DATA": MDB_DATA}
 
-# Default connection strings
-CONN_STR = get_connection_string(MDB_FILE)
-CONN_STR_DATA = get_connection_string(MDB_DATA)
+def __getattr__(name):
+    if name in _LAZY_CONN_STRS:
+        value = get_connection_string(_LAZY_CONN_STRS[name])
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
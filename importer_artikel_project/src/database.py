@@ -1,48 +1,349 @@
 import os
-import pyodbc
+import time
+import warnings
+import hashlib
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
 import pandas as pd
 from dotenv import load_dotenv
-from src.config import CONN_STR, SQL_DIR
+from src.config import (MDB_FILE, MDB_DATA, FETCH_ARRAYSIZE, AID_BATCH_SIZE, QUERY_WORKERS,
+                        KEY_TABLE_DIR, USE_KEY_TABLES, QUERY_BACKEND, FETCH_ENGINE)
+from src.backends import get_backend
+from src.query_cache import query_cache
+from src.sql_registry import sql_registry
+from src import arrow_fetch
+from src.fetcsv import FetcsvWriter
+from src.query_stats import query_stats, TimedConnection, new_timings, frame_memory, calling_importer
 
 # Load environment variables from .env file
 load_dotenv()
 
-def execute_query(query, params=None):
+# pd.read_sql gets plain DBAPI connections (wrapped by TimedConnection)
+warnings.filterwarnings('ignore', category=UserWarning,
+                        message='pandas only supports SQLAlchemy connectable')
+
+class ConnectionPool:
+    """
+    Thread-safe pool of long-lived connections to a single MDB file.
+    Connections are checked out per query and returned afterwards, so the
+    expensive engine connect only happens once per worker thread. The
+    backend decides what is actually opened for the MDB file (see src.backends).
+    """
+
+    def __init__(self, mdb_path, backend, max_idle=4):
+        self.mdb_path = Path(mdb_path)
+        self.backend = backend
+        self.max_idle = max_idle
+        self.opened = 0
+        self.connect_seconds = 0.0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @property
+    def source_path(self):
+        """File the pooled connections actually read from"""
+        return self.backend.source_path(self.mdb_path)
+
+    def _connect(self):
+        start = time.perf_counter()
+        conn = self.backend.connect(self.mdb_path)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.opened += 1
+            self.connect_seconds += elapsed
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn):
+        """Cheap liveness check before handing out an idle connection"""
+        try:
+            conn.cursor().close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def checkout(self):
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_healthy(conn):
+                return conn
+            self._close(conn)
+
+    def checkin(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; broken connections are dropped instead of returned"""
+        conn = self.checkout()
+        healthy = True
+        try:
+            yield conn
+        except Exception as e:
+            healthy = not isinstance(e, self.backend.errors)
+            raise
+        finally:
+            if healthy:
+                self.checkin(conn)
+            else:
+                self._close(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn)
+
+_pools = {}
+_pools_lock = threading.Lock()
+_backend_name = QUERY_BACKEND
+
+def set_backend(name):
+    """Route all following queries through the named backend ('access' or 'sqlite')"""
+    global _backend_name
+    get_backend(name)  # validate the name before switching
+    _backend_name = name
+    if name == 'sqlite':
+        from src.snapshot import check_snapshot
+        for mdb_path in (MDB_FILE, MDB_DATA):
+            check_snapshot(mdb_path)
+
+def use_snapshot(enabled=True):
+    """Route all queries to the local SQLite snapshot instead of the MDB files"""
+    set_backend('sqlite' if enabled else 'access')
+
+def get_pool(mdb_path=None, backend=None):
+    """Return the shared connection pool for an MDB file (default: MDB_FILE)"""
+    backend = backend or _backend_name
+    key = (str(Path(mdb_path or MDB_FILE).resolve()), backend)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key[0], get_backend(backend))
+        return pool
+
+def close_all_connections():
+    """Shutdown hook: close every pooled connection"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+atexit.register(close_all_connections)
+
+def connection_stats():
+    """Connections opened and seconds spent connecting, per MDB file"""
+    with _pools_lock:
+        return {
+            pool.source_path.name: {'opened': pool.opened, 'connect_seconds': pool.connect_seconds}
+            for pool in _pools.values()
+        }
+
+def print_connection_summary():
+    stats = connection_stats()
+    if not stats:
+        return
+    print("\n=== Connection Summary ===")
+    for name, s in stats.items():
+        print(f"{name}: {s['opened']} connection(s) opened, {s['connect_seconds']:.2f}s connecting")
+
+_fetch_engine = FETCH_ENGINE
+
+def set_fetch_engine(name):
+    """Fetch results with pd.read_sql ('pandas') or as Arrow record batches ('arrow')"""
+    global _fetch_engine
+    if name not in ('pandas', 'arrow'):
+        raise ValueError(f"Unknown fetch engine '{name}' (available: pandas, arrow)")
+    _fetch_engine = name
+
+def _query_label(query):
+    """SQL file name of a registry statement, else the start of the query text"""
+    return sql_registry.name_of(query) or ' '.join(query.split())[:60]
+
+def execute_query(query, params=None, mdb_path=None, label=None, batch=None, caller=None):
     """
     Execute a SQL query and return results as a DataFrame
     
     Args:
         query (str): SQL query string
         params (tuple/list/dict, optional): Parameters for the query
+        mdb_path (Path, optional): MDB file to query, defaults to MDB_FILE
+        label (str, optional): Name in the query report, defaults to the SQL file name
+        batch (tuple, optional): (batch number, batch count) for the query report
+        caller (str, optional): Importer method for the query report, detected if omitted
         
     Returns:
-        pd.DataFrame: Query results
+        pd.DataFrame: Query results (served from the query cache when the
+        same SQL already ran against an unchanged MDB file). With the arrow
+        fetch engine the columns are Arrow-backed.
     """
+    pool = get_pool(mdb_path)
+    label = label or _query_label(query)
+    caller = caller or calling_importer()
+    engine = _fetch_engine
+    variant = None if engine == 'pandas' else engine
+    timings = new_timings()
+    cached = query_cache.get(query, params, pool.source_path, variant)
+    if cached is not None:
+        query_stats.record(label, timings, len(cached), len(cached.columns), frame_memory(cached),
+                           params, batch, caller, cached=True, backend=pool.backend.name, engine=engine)
+        return cached
     try:
-        with pyodbc.connect(CONN_STR) as conn:
-            if isinstance(params, (tuple, list)):
-                return pd.read_sql(query, conn, params=params)
-            return pd.read_sql(query, conn, params=params)
+        if engine == 'arrow':
+            import pyarrow as pa
+            batches = list(iter_arrow(query, params, mdb_path, label=label, timings=timings))
+            df = arrow_fetch.to_frame(pa.Table.from_batches(batches))
+        else:
+            start = time.perf_counter()
+            with pool.connection() as conn:
+                timings['connect'] = time.perf_counter() - start
+                df = pd.read_sql(pool.backend.translate(query), TimedConnection(conn, timings), params=params)
+        query_stats.record(label, timings, len(df), len(df.columns), frame_memory(df),
+                           params, batch, caller, backend=pool.backend.name, engine=engine)
+        query_cache.put(query, params, pool.source_path, df, variant)
+        return df
     except Exception as e:
         print(f"Error in query: {query[:200]}...")
         if params:
             print(f"Parameters: {params[:5]}... (total: {len(params)} parameters)")
         raise Exception(f"Error executing query: {e}")
 
-def save_fetcsv(df, out_path, data_type="ARTICLE"):
-    """Save a DataFrame to CSV with FETCSV header"""
-    header = (
-        "FETCSV VERSION 1\n"
-        "HEADER VERSION 1\n"
-        "SEPARATOR ;\n"
-        "DECIMAL_SEPARATOR ,\n"
-        "LOCALE de\n"
-        f"DATA TYPE {data_type} VERSION 1\n"
-        "ACTION IMPORT\n"
-    )
-    with open(out_path, 'w', encoding='utf-8-sig', newline='') as f:
-        f.write(header)
-        df.to_csv(f, index=False, sep=';', decimal=',', lineterminator='\n')
+def iter_arrow(query, params=None, mdb_path=None, chunksize=None, label=None, timings=None):
+    """
+    Execute a SQL query and yield the results as pyarrow RecordBatches
+    
+    Declared column types of the SQL file ('-- @types ...') are applied. On
+    the Access backend with arrow-odbc installed the batches come straight
+    from the ODBC driver (on its own connection, outside the pool); otherwise
+    they are built column-wise from pooled cursor.fetchmany calls. An empty
+    result yields one zero-row batch that carries the columns.
+    
+    Args:
+        query (str): SQL query string
+        params (tuple/list, optional): Parameters for the query
+        mdb_path (Path, optional): MDB file to query, defaults to MDB_FILE
+        chunksize (int, optional): Rows per batch, defaults to FETCH_ARRAYSIZE
+        label (str, optional): SQL file name for the type declarations, detected if omitted
+        timings (dict, optional): Accumulates connect / execute / fetch seconds
+        
+    Yields:
+        pyarrow.RecordBatch: Consecutive batches of the query result
+    """
+    chunksize = chunksize or FETCH_ARRAYSIZE
+    pool = get_pool(mdb_path)
+    template = sql_registry.get(label or sql_registry.name_of(query) or '')
+    types = arrow_fetch.resolve_types(template.column_types if template else None)
+    timings = timings if timings is not None else new_timings()
+    sql = pool.backend.translate(query)
+
+    if arrow_fetch.arrow_odbc_available():
+        connection_string = pool.backend.odbc_connection_string(pool.mdb_path)
+        if connection_string:
+            yield from arrow_fetch.iter_odbc_batches(connection_string, sql, params, chunksize, types, timings)
+            return
+
+    start = time.perf_counter()
+    with pool.connection() as conn:
+        timings['connect'] += time.perf_counter() - start
+        cursor = TimedConnection(conn, timings).cursor()
+        try:
+            yield from arrow_fetch.iter_cursor_batches(cursor, sql, params, chunksize, types)
+        finally:
+            cursor.close()
+
+def _iter_pandas_chunks(pool, query, params, chunksize, timings):
+    """DataFrame chunks from pooled cursor.fetchmany calls"""
+    start = time.perf_counter()
+    with pool.connection() as conn:
+        timings['connect'] = time.perf_counter() - start
+        cursor = TimedConnection(conn, timings).cursor()
+        cursor.arraysize = chunksize
+        try:
+            if params is not None:
+                cursor.execute(pool.backend.translate(query), params)
+            else:
+                cursor.execute(pool.backend.translate(query))
+            columns = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        finally:
+            cursor.close()
+
+def iter_query(query, params=None, mdb_path=None, chunksize=None, label=None, batch=None):
+    """
+    Execute a SQL query and yield the results as DataFrame chunks
+    
+    Rows are pulled with cursor.fetchmany (or as Arrow record batches with
+    the arrow fetch engine), so peak memory is bounded by the chunk size
+    instead of the full result. Streamed results bypass the query cache,
+    and dtypes are inferred per chunk.
+    
+    Args:
+        query (str): SQL query string
+        params (tuple/list, optional): Parameters for the query
+        mdb_path (Path, optional): MDB file to query, defaults to MDB_FILE
+        chunksize (int, optional): Rows per chunk, defaults to FETCH_ARRAYSIZE
+        label (str, optional): Name in the query report, defaults to the SQL file name
+        batch (tuple, optional): (batch number, batch count) for the query report
+        
+    Yields:
+        pd.DataFrame: Consecutive chunks of the query result
+    """
+    chunksize = chunksize or FETCH_ARRAYSIZE
+    pool = get_pool(mdb_path)
+    label = label or _query_label(query)
+    engine = _fetch_engine
+    timings = new_timings()
+    rows_total = columns_total = memory_total = 0
+    if engine == 'arrow':
+        chunks = (arrow_fetch.to_frame(b) for b in iter_arrow(query, params, mdb_path, chunksize, label, timings))
+    else:
+        chunks = _iter_pandas_chunks(pool, query, params, chunksize, timings)
+    try:
+        for chunk in chunks:
+            columns_total = len(chunk.columns)
+            if chunk.empty:
+                continue
+            rows_total += len(chunk)
+            memory_total += frame_memory(chunk)
+            yield chunk
+        query_stats.record(label, timings, rows_total, columns_total, memory_total, params, batch,
+                           calling_importer(), backend=pool.backend.name, engine=engine)
+    except pool.backend.errors as e:
+        print(f"Error in query: {query[:200]}...")
+        raise Exception(f"Error executing query: {e}")
+
+def save_fetcsv(df, out_path, data_type="ARTICLE", schema=None, volatile_columns=()):
+    """
+    Save a DataFrame to CSV with FETCSV header (chunked output: see FetcsvWriter).
+    schema: output schema (see src/fetcsv.py) giving column order and number/date formats
+    volatile_columns: run-date columns left out of the content hash (see FetcsvWriter)
+    Returns 'written', or 'unchanged' if skip-unchanged mode kept the identical file of
+    the previous run (see src/output_manifest.py).
+    """
+    with FetcsvWriter(out_path, data_type, schema, volatile_columns=volatile_columns) as writer:
+        writer.write(df, keep_empty=True)
+    return writer.status
 
 def read_fetcsv(file_path, **kwargs):
     """Read a FETCSV file, skipping the header if present"""
@@ -77,23 +378,165 @@ def read_csv_file(file_path, required_columns=None, **kwargs):
     
     return df
 
-def read_sql_query(sql_file, aids=None):
-    """Read and format SQL query with optional AIDs"""
-    from pathlib import Path
-    
-    sql_path = Path(__file__).parent.parent / "sql" / sql_file
-    if not sql_path.exists():
-        raise FileNotFoundError(f"SQL file not found: {sql_path}")
-    
-    sql_query = sql_path.read_text(encoding='utf-8').strip()
-    sql_query = '\n'.join(line for line in sql_query.split('\n') 
-                          if not line.strip().startswith('--'))
-    
+def read_sql_query(sql_file, aids=None, key_table=None):
+    """Format a SQL file from the registry with optional AIDs (or a staged key table holding them)"""
+    if key_table:
+        return sql_registry.statement(sql_file, aid_placeholders=f"SELECT KeyValue FROM {key_table}")
     if aids:
         formatted_aids = ["'" + str(aid).replace("'", "''") + "'" for aid in aids]
-        sql_query = sql_query.replace("{aid_placeholders}", ", ".join(formatted_aids))
+        return sql_registry.statement(sql_file, aid_placeholders=", ".join(formatted_aids))
+    return sql_registry.statement(sql_file)
+
+def stage_keys(keys):
+    """
+    Write diff keys (AIDs, AdrIds, areas) to a key file the Access engine can
+    join against through its Text ISAM driver, so filtering happens inside the
+    database and only matching rows cross the ODBC boundary. The MDB file
+    itself is never modified, which keeps the query cache valid.
     
-    return sql_query
+    Returns:
+        str: Table reference usable in FROM / JOIN / IN (SELECT ...) clauses
+    """
+    keys = sorted({str(k) for k in keys})
+    digest = hashlib.sha1('\n'.join(keys).encode('utf-8')).hexdigest()[:16]
+    key_dir = KEY_TABLE_DIR / digest
+    key_file = key_dir / 'keys.csv'
+    if not key_file.exists():
+        key_dir.mkdir(parents=True, exist_ok=True)
+        (key_dir / 'schema.ini').write_text(
+            "[keys.csv]\nColNameHeader=True\nFormat=CSVDelimited\nCharacterSet=65001\n"
+            "Col1=KeyValue Text Width 255\n", encoding='utf-8')
+        tmp_file = key_dir / f"keys.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8', newline='') as f:
+            f.write('KeyValue\n')
+            f.writelines('"' + k.replace('"', '""') + '"\n' for k in keys)
+        os.replace(tmp_file, key_file)
+    return f"[Text;HDR=Yes;FMT=Delimited;DATABASE={key_dir}].[keys#csv]"
+
+def join_key_table(query, keys, key_expr):
+    """Wrap a query so only rows whose key_expr (in terms of alias q) is in keys are returned"""
+    query = query.strip().rstrip(';')
+    return (f"SELECT q.* FROM ({query}) AS q "
+            f"INNER JOIN {stage_keys(keys)} AS k ON {key_expr} = k.KeyValue")
+
+def _use_key_tables(mdb_path=None):
+    """Key files need the Text ISAM driver, so only some backends can join them"""
+    return USE_KEY_TABLES and get_pool(mdb_path).backend.supports_key_files
+
+def execute_query_by_keys(query, keys, key_expr, params=None, mdb_path=None):
+    """
+    Execute a query restricted to the given keys via a staged key table.
+    Falls back to the unfiltered query if the key join fails, so callers
+    should keep their Python-side filter as a safety net.
+    """
+    if keys and _use_key_tables(mdb_path):
+        try:
+            return execute_query(join_key_table(query, keys, key_expr), params, mdb_path, label=_query_label(query))
+        except Exception as e:
+            print(f"Warning: Key table join failed, filtering in Python instead: {e}")
+    return execute_query(query, params, mdb_path)
+
+def _iter_with_fallback(chunks, fallback, warning):
+    """Yield from chunks; if the query fails before the first chunk, yield from fallback() instead"""
+    try:
+        first = next(chunks, None)
+    except Exception as e:
+        print(f"Warning: {warning}: {e}")
+        yield from fallback()
+        return
+    if first is not None:
+        yield first
+    yield from chunks
+
+def iter_query_by_keys(query, keys, key_expr, params=None, mdb_path=None, chunksize=None):
+    """Streaming counterpart of execute_query_by_keys"""
+    def unfiltered():
+        return iter_query(query, params, mdb_path, chunksize)
+
+    if keys and _use_key_tables(mdb_path):
+        chunks = iter_query(join_key_table(query, keys, key_expr), params, mdb_path, chunksize,
+                            label=_query_label(query))
+        yield from _iter_with_fallback(chunks, unfiltered, "Key table join failed, filtering in Python instead")
+    else:
+        yield from unfiltered()
+
+def _aid_batches(aids, batch_size=None):
+    """Split AIDs into sorted batches (sorted so the SQL text is stable across runs)"""
+    aids = sorted({str(aid) for aid in aids})
+    batch_size = batch_size or AID_BATCH_SIZE
+    return [aids[i:i + batch_size] for i in range(0, len(aids), batch_size)]
+
+def execute_sql_file(sql_file, aids=None, batch_size=None, max_workers=None, mdb_path=None):
+    """
+    Execute a SQL file, filling {aid_placeholders} in batches
+    
+    AID lists larger than AID_BATCH_SIZE are joined against a staged key
+    table (see stage_keys). If that is disabled or fails, they are split into
+    batches that run concurrently on pooled connections, and the batch results
+    are concatenated with the column order of the first batch.
+    
+    Args:
+        sql_file (str): File name inside the sql directory
+        aids (iterable, optional): AIDs for the IN (...) list
+        batch_size (int, optional): AIDs per batch, defaults to AID_BATCH_SIZE
+        max_workers (int, optional): Concurrent batches, defaults to QUERY_WORKERS
+        mdb_path (Path, optional): MDB file to query, defaults to MDB_FILE
+        
+    Returns:
+        pd.DataFrame: Combined query results
+    """
+    if not aids:
+        return execute_query(read_sql_query(sql_file, aids), mdb_path=mdb_path)
+
+    batches = _aid_batches(aids, batch_size)
+    if len(batches) == 1:
+        return execute_query(read_sql_query(sql_file, batches[0]), mdb_path=mdb_path)
+
+    if _use_key_tables(mdb_path):
+        try:
+            return execute_query(read_sql_query(sql_file, key_table=stage_keys(aids)), mdb_path=mdb_path)
+        except Exception as e:
+            print(f"Warning: Key table join failed, falling back to AID batches: {e}")
+
+    caller = calling_importer()
+
+    def run_batch(i, batch):
+        start = time.perf_counter()
+        df = execute_query(read_sql_query(sql_file, batch), mdb_path=mdb_path,
+                           batch=(i, len(batches)), caller=caller)
+        return df, time.perf_counter() - start
+
+    workers = min(max_workers or QUERY_WORKERS, len(batches))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(run_batch, range(1, len(batches) + 1), batches))
+
+    for i, ((df, elapsed), batch) in enumerate(zip(results, batches), 1):
+        print(f"  {sql_file} batch {i}/{len(batches)}: {len(batch)} AIDs, {len(df)} rows in {elapsed:.2f}s")
+    print(f"  {sql_file}: {len(batches)} batches on {workers} connections in {time.perf_counter() - start:.2f}s")
+
+    frames = [df for df, _ in results]
+    columns = frames[0].columns
+    return pd.concat(frames, ignore_index=True)[columns]
+
+def iter_sql_file(sql_file, aids=None, batch_size=None, mdb_path=None, chunksize=None):
+    """Streaming counterpart of execute_sql_file: yields chunks batch after batch"""
+    if not aids:
+        yield from iter_query(read_sql_query(sql_file, aids), mdb_path=mdb_path, chunksize=chunksize)
+        return
+
+    batches = _aid_batches(aids, batch_size)
+
+    def batched():
+        for i, batch in enumerate(batches, 1):
+            yield from iter_query(read_sql_query(sql_file, batch), mdb_path=mdb_path, chunksize=chunksize,
+                                  batch=(i, len(batches)))
+
+    if len(batches) > 1 and _use_key_tables(mdb_path):
+        chunks = iter_query(read_sql_query(sql_file, key_table=stage_keys(aids)), mdb_path=mdb_path, chunksize=chunksize)
+        yield from _iter_with_fallback(chunks, batched, "Key table join failed, falling back to AID batches")
+    else:
+        yield from batched()
 
 def get_sql_server_connection():
     """
@@ -117,6 +560,7 @@ def get_sql_server_connection():
     
     connection_string = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={server};DATABASE={database};UID={username};PWD={password}"
     
+    import pyodbc
     try:
         conn = pyodbc.connect(connection_string)
         return conn
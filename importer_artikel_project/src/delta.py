@@ -0,0 +1,126 @@
+"""
+Delta mode for the article exports.
+
+Every export with an 'aid' column gets a content hash per AID: the sum of
+the row hashes of all its rows (so row order and chunking do not matter)
+plus a hash of the column names (so a changed layout re-exports everything).
+The hashes of the previous run are kept per export file in data/cache/delta;
+in delta mode only the rows of new and changed AIDs are written:
+
+    python -m src.main --stages sku --delta
+
+Columns stamped with the run date are left out of the hash, otherwise every
+AID would change every day. Each export passes its own list; the default is
+DELTA_IGNORE_COLUMNS (valid_from, valid_to_text, ...), while the validity
+price lists leave out only valid_to, since their valid_from comes from
+Price_ERP.csv and is real data. The stored
+hashes are only updated after the file has been written, and runs limited
+to a diff list update just the AIDs they exported.
+"""
+import threading
+from src.config import DELTA_DIR, DELTA_IGNORE_COLUMNS, DELTA_MODE
+
+class DeltaStore:
+    """Per-AID content hashes of the previous run, one Parquet file per export"""
+
+    def __init__(self, state_dir=DELTA_DIR, enabled=DELTA_MODE):
+        self.state_dir = state_dir
+        self.enabled = enabled
+        self.totals = {'inserted': 0, 'changed': 0, 'unchanged': 0}
+        self._lock = threading.Lock()
+        self._parquet_checked = False
+
+    def _parquet_available(self):
+        if not self._parquet_checked:
+            self._parquet_checked = True
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print("Warning: pyarrow not installed, delta mode disabled (full exports)")
+                self.enabled = False
+        return self.enabled
+
+    def _state_path(self, filename):
+        return self.state_dir / f"{filename}.parquet"
+
+    @staticmethod
+    def aid_hashes(df, ignore_columns=DELTA_IGNORE_COLUMNS):
+        """uint64 content hash per AID of df (index: aid), without the ignore_columns"""
+        import numpy as np
+        import pandas as pd
+        from pandas.util import hash_array, hash_pandas_object
+
+        content = df.drop(columns=[c for c in ignore_columns if c in df.columns])
+        layout = hash_array(np.array(['|'.join(map(str, content.columns))], dtype=object))[0]
+        rows = hash_pandas_object(content, index=False)
+        aids = df['aid'].astype(str).to_numpy()
+        # uint64 sums wrap around, which is fine for a hash
+        return rows.groupby(aids, sort=False).sum() + layout
+
+    def _load(self, filename):
+        import pandas as pd
+        path = self._state_path(filename)
+        if not path.exists():
+            return pd.Series(dtype='uint64')
+        try:
+            state = pd.read_parquet(path)
+            return pd.Series(state['hash'].to_numpy(), index=state['aid'].to_numpy())
+        except Exception as e:
+            print(f"Warning: Delta state for {filename} unreadable, exporting all rows: {e}")
+            return pd.Series(dtype='uint64')
+
+    def select(self, df, filename, ignore_columns=DELTA_IGNORE_COLUMNS):
+        """
+        (rows of new and changed AIDs, hashes to commit after the write); ignore_columns are the
+        export's run-date columns. Returns (df, None) outside delta mode and for exports without an 'aid' column.
+        """
+        if not self.enabled or 'aid' not in df.columns or not self._parquet_available():
+            return df, None
+
+        current = self.aid_hashes(df, ignore_columns)
+        previous = self._load(filename)
+        inserted = ~current.index.isin(previous.index)
+        known = current.index[~inserted]
+        # compared on the known AIDs only: a reindex with missing values would turn the hashes into floats
+        changed = known[previous.loc[known].to_numpy() != current.loc[known].to_numpy()]
+        emit = current.index[inserted].union(changed, sort=False)
+
+        counts = {'inserted': int(inserted.sum()), 'changed': len(changed)}
+        counts['unchanged'] = len(current) - counts['inserted'] - counts['changed']
+        with self._lock:
+            for key, count in counts.items():
+                self.totals[key] += count
+        print(f"Delta {filename}: {counts['inserted']} inserted, {counts['changed']} changed, "
+              f"{counts['unchanged']} unchanged AIDs")
+        return df[df['aid'].astype(str).isin(emit)], current
+
+    def commit(self, filename, hashes):
+        """Store the hashes of a written export (merged into the previous state)"""
+        if hashes is None:
+            return
+        import pandas as pd
+        state = self._load(filename)
+        state = pd.concat([state[~state.index.isin(hashes.index)], hashes])
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            path = self._state_path(filename)
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            pd.DataFrame({'aid': state.index.astype(str), 'hash': state.to_numpy(dtype='uint64')}).to_parquet(tmp_path, index=False)
+            tmp_path.replace(path)
+        except Exception as e:
+            print(f"Warning: Delta state for {filename} not saved: {e}")
+
+    def clear(self):
+        for p in self.state_dir.glob('*.parquet'):
+            p.unlink(missing_ok=True)
+
+    def print_summary(self):
+        if any(self.totals.values()):
+            print(f"Delta exports: {self.totals['inserted']} inserted, {self.totals['changed']} changed, "
+                  f"{self.totals['unchanged']} unchanged AIDs")
+
+delta_store = DeltaStore()
+
+def set_delta_enabled(enabled):
+    """Switch delta mode on or off (e.g. for --delta)"""
+    delta_store.enabled = enabled
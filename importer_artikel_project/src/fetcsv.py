@@ -0,0 +1,231 @@
+"""
+Output schemas for FETCSV files.
+
+A schema is the ordered list of (column, format) pairs of one export file;
+format is None for columns written as they are, or one of the formatters
+below. The importers keep numbers and dates in their native dtypes and
+save_fetcsv(df, path, schema=...) formats them at write time:
+
+    PACKAGING_SCHEMA = [('aid', None), ('length', number(1)), ('valid_from', date())]
+
+Formatters work on the distinct values of a column (a price or a dimension
+repeats across thousands of SKUs), so each value is formatted once. Columns
+of the schema missing from the frame are skipped.
+
+FetcsvWriter writes a file chunk by chunk, so streamed exports never hold
+the whole output in memory:
+
+    with FetcsvWriter(path, "STOCK") as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    print(writer.rows, writer.bytes, writer.status)
+
+While writing it computes two hashes. sha256 is the SHA-256 of the bytes
+written to the file (byte order mark included), for the consumers of the
+file to check it against. digest is a content fingerprint used only for
+skip-unchanged: a SHA-256 over the header, the column names and the row
+hashes of the columns. Exports stamped with
+the run date pass those columns as volatile_columns (the article importer
+passes each export's run-date columns, e.g. valid_from for the basis and
+price lists, only valid_to for the validity lists); they are left out of
+the fingerprint, so an export whose data did not change keeps its
+fingerprint from one day to the next.
+With skip-unchanged mode on (see src/output_manifest.py), a finished file
+whose fingerprint equals the previous run's is discarded instead of being
+moved into place, so it is not handed on to the ERP import again. The file
+is still written to its temporary name first; what is skipped is the
+replace and the hand-off, not the write itself.
+"""
+import os
+import time
+import codecs
+import hashlib
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+from src.config import WRITE_BUFFER_BYTES
+from src.output_manifest import output_manifest
+
+def fetcsv_header(data_type):
+    """The seven FETCSV header lines in front of the column names"""
+    return (
+        "FETCSV VERSION 1\n"
+        "HEADER VERSION 1\n"
+        "SEPARATOR ;\n"
+        "DECIMAL_SEPARATOR ,\n"
+        "LOCALE de\n"
+        f"DATA TYPE {data_type} VERSION 1\n"
+        "ACTION IMPORT\n"
+    )
+
+def _per_value(series, format_value, missing):
+    """format_value applied once per distinct value; missing values become missing"""
+    codes, uniques = pd.factorize(series)
+    formatted = np.array([format_value(v) for v in uniques.tolist()] + [missing], dtype=object)
+    return pd.Series(formatted[codes], index=series.index)  # code -1 (missing) picks the last entry
+
+def number(precision=None, missing=''):
+    """
+    Numbers with a decimal comma: precision digits after the comma, or as
+    str() writes them when precision is None (12.5 -> '12,5', 3.0 -> '3,0').
+    """
+    def format_value(value):
+        text = str(value) if precision is None else f"{value:.{precision}f}"
+        return text.replace('.', ',')
+
+    def format_column(series):
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iuf':
+            return _per_value(series, format_value, missing)
+        # e.g. Decimal objects: equal values may print differently ('1.0' / '1.00'), so no de-duplication
+        return series.map(lambda v: missing if pd.isna(v) else format_value(v))
+    return format_column
+
+def date(fmt='%Y%m%d', missing=''):
+    """Dates (datetime values or date strings) as fmt"""
+    def format_column(series):
+        return _per_value(pd.to_datetime(series), lambda value: value.strftime(fmt), missing)
+    return format_column
+
+def schema_columns(schema):
+    """Column names of a schema, in file order"""
+    return [column for column, _ in schema]
+
+def apply_schema(df, schema):
+    """The schema's columns of df, in schema order, with numbers and dates formatted"""
+    data = {}
+    for column, format_column in schema:
+        if column in df.columns:
+            data[column] = df[column] if format_column is None else format_column(df[column])
+    return pd.DataFrame(data, index=df.index)
+
+class FetcsvWriter:
+    """
+    Incremental FETCSV file: header and column names with the first non-empty
+    chunk, then rows chunk by chunk through one buffered file handle.
+
+    Every chunk must have the columns of the first one (a different order is
+    put back in line, other columns raise ValueError). The file is written
+    under a temporary name and moved into place by close(), so readers never
+    see half a file; a writer that got no rows leaves no file, and an
+    exception inside the with block discards the partial file.
+
+    After close(), status is 'written' or 'unchanged' (same content as the
+    previous run's file apart from volatile_columns, discarded), sha256 is
+    the hash of the file's bytes, digest the content fingerprint and seconds
+    the time spent formatting and writing (not waiting for the chunks).
+    """
+
+    def __init__(self, out_path, data_type="ARTICLE", schema=None, buffer_size=WRITE_BUFFER_BYTES,
+                 volatile_columns=()):
+        self.path = Path(out_path)
+        self.data_type = data_type
+        self.schema = schema
+        self.buffer_size = buffer_size
+        self.volatile_columns = volatile_columns
+        self.columns = None
+        self.rows = 0
+        self.bytes = 0
+        self.status = None
+        self.digest = None
+        self.sha256 = None
+        self.seconds = 0.0
+        self._file = None
+        self._tmp_path = None
+        self._hash = hashlib.sha256()
+        self._file_hash = hashlib.sha256()
+
+    def _fingerprint(self, df):
+        """Add the rows of df to the fingerprint, without the volatile columns"""
+        content = df.drop(columns=[c for c in self.volatile_columns if c in df.columns])
+        if len(content.columns):
+            self._hash.update(hash_pandas_object(content, index=False).to_numpy().tobytes())
+        else:
+            self._hash.update(f"{len(content)} rows\n".encode('utf-8'))
+
+    def _emit(self, text):
+        """Write text to the file and add its bytes to the file hash"""
+        self._file.write(text)
+        self._file_hash.update(text.encode('utf-8'))
+
+    def _open(self, columns):
+        self.columns = columns
+        self._tmp_path = self.path.with_name(f"{self.path.name}.{threading.get_ident()}.tmp")
+        self._file = open(self._tmp_path, 'w', encoding='utf-8-sig', newline='', buffering=self.buffer_size)
+        self._file_hash.update(codecs.BOM_UTF8)  # written by the utf-8-sig codec
+        header = fetcsv_header(self.data_type)
+        self._emit(header)
+        self._hash.update((header + ';'.join(map(str, columns)) + '\n').encode('utf-8'))
+
+    def write(self, df, keep_empty=False):
+        """Append the rows of df (None and empty frames are ignored; keep_empty writes the header of an empty first frame)"""
+        start = time.perf_counter()
+        try:
+            self._write(df, keep_empty)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def _write(self, df, keep_empty):
+        if df is None:
+            return
+        if df.empty:
+            if keep_empty and self._file is None and self.columns is None:
+                if self.schema is not None:
+                    df = apply_schema(df, self.schema)
+                self._open(list(df.columns))
+                self._emit(df.to_csv(index=False, sep=';', decimal=',', lineterminator='\n'))
+            return
+        if self.schema is not None:
+            df = apply_schema(df, self.schema)
+        columns = list(df.columns)
+        first = self._file is None
+        if first:
+            if self.columns is not None:
+                raise ValueError(f"{self.path.name}: writer is already closed")
+            self._open(columns)
+        elif columns != self.columns:
+            if len(columns) != len(self.columns) or set(columns) != set(self.columns):
+                raise ValueError(f"{self.path.name}: chunk columns {columns} differ from {self.columns}")
+            df = df[self.columns]
+        self._emit(df.to_csv(index=False, header=first, sep=';', decimal=',', lineterminator='\n'))
+        self._fingerprint(df)
+        self.rows += len(df)
+
+    def close(self):
+        """Move the finished file into place (unless unchanged); sets bytes, sha256, digest and status"""
+        if self._file is None:
+            return
+        start = time.perf_counter()
+        self._file.close()
+        self._file = None
+        self.bytes = self._tmp_path.stat().st_size
+        self.digest = self._hash.hexdigest()
+        self.sha256 = self._file_hash.hexdigest()
+        if output_manifest.is_unchanged(self.path, self.digest):
+            self._tmp_path.unlink(missing_ok=True)
+            self.status = 'unchanged'
+        else:
+            os.replace(self._tmp_path, self.path)
+            self.status = 'written'
+        self.seconds += time.perf_counter() - start
+        output_manifest.record(self.path, self.status, self.rows, self.bytes, self.digest,
+                               sha256=self.sha256, data_type=self.data_type, seconds=self.seconds)
+
+    def abort(self):
+        """Discard the partial file"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -1,6 +1,5 @@
 import warnings
 import sys
-import pandas as pd
 from pathlib import Path
 
 # Setup
@@ -8,28 +7,16 @@ OUTPUT_DIR = Path(__file__).parent.parent / 'data' / 'output'
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 sys.path.append(str(Path(__file__).parent.parent))
 
-# Import from the local module since we're already in the src directory
-from src.database import read_csv_file, save_fetcsv
-from src.article_importer_class import ArticleImporter
-from src.order_importer_class import OrderImporter
-from src.stock_importer_class import StockImporter
-from src.bp_importer_class import BusinessPartnerImporter
-from src.sku_color_processor import process_colors
+# Importers (and with them pandas / pyodbc) are imported inside the stage
+# functions, so a run only pays for the stages it actually executes
 
 warnings.filterwarnings('ignore', category=UserWarning, 
                       message='pandas only supports SQLAlchemy connectable')
 
 # Helper functions
-def safe_process_colors(file_path, sku_column='aid'):
-    """Safely process colors for a file"""
-    if file_path and Path(file_path).exists():
-        try:
-            process_colors(csv_file_path=Path(file_path), sku_column=sku_column)
-        except Exception as e:
-            print(f"Warning: Error processing colors for {file_path}: {e}")
-
 def safe_rename(src, dst, display_name):
-    """Safely rename a file"""
+    """Safely rename a file (the run manifest gets the final name)"""
+    from src.output_manifest import output_manifest
     try:
         src_path = Path(src)
         dst_path = Path(dst)
@@ -38,22 +25,25 @@ def safe_rename(src, dst, display_name):
             if dst_path.exists():
                 dst_path.unlink()
             src_path.rename(dst_path)
+            output_manifest.renamed(src_path, dst_path)
             print(f"[OK] {display_name}")
     except Exception as e:
         print(f"[ERROR] Error renaming {display_name}: {e}")
 
 def get_diff(diff_name='diff'):
-    """Get diff from comparison module"""
+    """Get diff from comparison module (computed on first use, no reports written)"""
     try:
-        from run_comparison_standalone import diff, diff1
-        return diff if diff_name == 'diff' else diff1
+        from run_comparison_standalone import load_diff
+        return load_diff('diff' if diff_name == 'diff' else 'diff1')
     except (ImportError, FileNotFoundError):
         return None
 
-def process_sku_data():
+def export_sku_data():
+    """Run the SKU exports (SKU colours rewritten before each write); returns the written files for the rename step"""
+    from src.article_importer_class import ArticleImporter
     diff = get_diff('diff')
     # Initialize importer
-    importer = ArticleImporter(diff=diff)
+    importer = ArticleImporter(diff=diff, rewrite_colors=True)
     
     # Process core SKU data
     print("\n=== Processing Core SKU Data ===")
@@ -69,9 +59,7 @@ def process_sku_data():
     sku_pricestaffeln_file = None
     sku_price_file = None
     try:
-        sku_basicprice_file = importer.import_artikel_basicprice() # Default args are fine or baked into class method if simplified
-        sku_pricestaffeln_file = importer.import_artikel_pricestaffeln()
-        sku_price_file = importer.import_artikel_preisstufe_3_7()
+        sku_basicprice_file, sku_pricestaffeln_file, sku_price_file = importer.import_artikel_prices()
     except Exception as e:
         print(f"Error processing price data: {e}")
         import traceback
@@ -108,7 +96,7 @@ def process_sku_data():
         (OUTPUT_DIR / "sku_text_webshoptext.csv", "SKU_TEXT - Webshoptext.csv"),
     ]
     # Remove any None entries
-    output_files = [f for f in output_files if f[0] is not None]
+    output_files = [f for f in output_files if f is not None and f[0] is not None]
     
     # Add price files by finding them in OUTPUT_DIR (since import functions don't return paths)
     price_files = [
@@ -122,53 +110,53 @@ def process_sku_data():
     
     for source_name, final_name in price_files:
         price_file = OUTPUT_DIR / source_name
+        # validity lists are written without the 'aktiv' column (see pricing.validity_prices);
+        # a file left out as unchanged is not there and is not renamed
         if price_file.exists():
-            # For validity files, ensure 'aktiv' column is removed
-            if 'validity' in str(price_file).lower():
-                try:
-                    df = read_csv_file(price_file, dtype=str)
-                    if 'aktiv' in df.columns:
-                        df = df.drop(columns=['aktiv'])
-                        save_fetcsv(df, price_file, "ARTICLE")
-                except Exception as e:
-                    print(f"Warning: Could not process {price_file}: {e}")
             output_files.append((price_file, final_name))
-    
-    # Process colors and rename files
-    print("\n=== Processing Colors ===")
-    processed_files = set()
-    for file_path, final_name in output_files:
-        if file_path and Path(file_path).exists() and str(file_path) not in processed_files:
-            safe_process_colors(file_path)
-            safe_rename(file_path, Path(file_path).parent / final_name, final_name)
-            processed_files.add(str(file_path))
-    
-    # Process text files
+
+    return {'output_files': output_files, 'text_files': sku_text_files, 'text_en_files': sku_text_en_files}
+
+def _sku_text_targets(sku_files):
+    """(text file, final name stem) for SKU text files not already covered by output_files"""
     text_types = ['webshoptext', 'artikeltext', 'katalogtext', 'vertriebstext', 'rechnungstext', 'pflegehinweise']
-    
-    # Process German text files
-    for text_file in sku_text_files:
-        if text_file and Path(text_file).exists():
+    handled = {str(file_path) for file_path, _ in sku_files['output_files']}
+    targets = []
+    # German text files
+    for text_file in sku_files['text_files']:
+        if text_file and str(text_file) not in handled:
             file_stem = Path(text_file).stem.lower()
             for text_type in text_types:
                 if text_type in file_stem and '_en_' not in file_stem:
-                    final_name = f"SKU_TEXT - {text_type.capitalize()}.csv"
-                    safe_process_colors(text_file, f"SKU_TEXT - {text_type.capitalize()}")
-                    safe_rename(text_file, Path(text_file).parent / final_name, final_name)
+                    targets.append((text_file, f"SKU_TEXT - {text_type.capitalize()}"))
                     break
-
-    # Process English text files
-    for text_file in sku_text_en_files:
-        if text_file and Path(text_file).exists():
+    # English text files
+    for text_file in sku_files['text_en_files']:
+        if text_file and str(text_file) not in handled:
             file_stem = Path(text_file).stem.lower()
             for text_type in text_types:
                 if text_type in file_stem:
-                    final_name = f"SKU_TEXT_EN - {text_type.capitalize()}.csv"
-                    safe_process_colors(text_file, f"SKU_TEXT_EN - {text_type.capitalize()}")
-                    safe_rename(text_file, Path(text_file).parent / final_name, final_name)
+                    targets.append((text_file, f"SKU_TEXT_EN - {text_type.capitalize()}"))
                     break
+    return targets
 
-def process_article_data():
+def rename_sku_files(sku_files):
+    """Give the SKU exports their final import file names"""
+    processed_files = set()
+    for file_path, final_name in sku_files['output_files']:
+        if file_path and Path(file_path).exists() and str(file_path) not in processed_files:
+            safe_rename(file_path, Path(file_path).parent / final_name, final_name)
+            processed_files.add(str(file_path))
+    for text_file, name in _sku_text_targets(sku_files):
+        if Path(text_file).exists():
+            safe_rename(text_file, Path(text_file).parent / f"{name}.csv", f"{name}.csv")
+
+def process_sku_data():
+    rename_sku_files(export_sku_data())
+
+def export_article_data():
+    """Run the article exports; returns the written files for the rename step"""
+    from src.article_importer_class import ArticleImporter
     diff1 = get_diff('diff1')
     print(f"\nProcessing article data for {len(diff1)} AIDs..." if diff1 else "\nProcessing all article data...")
     
@@ -183,31 +171,38 @@ def process_article_data():
         (importer.import_artikel_variant(), "ARTICLE_VARIANT - Artikel-Variantenverknüpfung Import.csv")
     ]
     
-    # Rename files
-    for file_path, final_name in files:
-        if file_path and Path(file_path).exists():
-            safe_rename(file_path, Path(file_path).parent / final_name, final_name)
-    
     # Process text files
     artikel_text_files = importer.import_artikel_text() or []
     artikel_text_en_files = importer.import_artikel_text_en() or []
+    return {'files': files, 'text_files': artikel_text_files, 'text_en_files': artikel_text_en_files}
+
+def rename_article_files(article_files):
+    """Give the article exports their final import file names"""
+    # Rename files
+    for file_path, final_name in article_files['files']:
+        if file_path and Path(file_path).exists():
+            safe_rename(file_path, Path(file_path).parent / final_name, final_name)
     
     # Process German text files
-    for text_file in artikel_text_files:
+    for text_file in article_files['text_files']:
         if text_file and Path(text_file).exists():
             file_type = Path(text_file).stem.split('_')[-1]
             final_name = f"ARTICLE_TEXT-{file_type.upper()}.csv"
             safe_rename(text_file, Path(text_file).parent / final_name, final_name)
 
     # Process English text files
-    for text_file in artikel_text_en_files:
+    for text_file in article_files['text_en_files']:
         if text_file and Path(text_file).exists():
             file_type = Path(text_file).stem.split('_')[-1]
             final_name = f"ARTICLE_TEXT_EN-{file_type.upper()}.csv"
             safe_rename(text_file, Path(text_file).parent / final_name, final_name)
 
+def process_article_data():
+    rename_article_files(export_article_data())
+
 def process_order_data():
     print("\n=== Processing Order Data ===")
+    from src.order_importer_class import OrderImporter
     try:
         # Initialize importer
         importer = OrderImporter()
@@ -235,6 +230,7 @@ def process_order_data():
 
 def process_stock_data():
     print("\n=== Processing Stock Data ===")
+    from src.stock_importer_class import StockImporter
     try:
         stock_importer = StockImporter()
         stock_files = stock_importer.import_stock_lager()
@@ -247,6 +243,7 @@ def process_stock_data():
 
 def process_business_partner_data():
     print("\n=== Processing Business Partner Data ===")
+    from src.bp_importer_class import BusinessPartnerImporter
     try:
         bp_importer = BusinessPartnerImporter()
         
@@ -314,23 +311,87 @@ def process_business_partner_data():
     except Exception as e:
         print(f"[ERROR] Business Partner import failed: {e}")
 
-def main():
+def build_stages():
+    """The pipeline: stage name, function, dependencies and group (see src.pipeline)"""
+    from src.pipeline import Stage
+    return [
+        Stage('sku_export', export_sku_data, group='sku'),
+        Stage('sku_rename', rename_sku_files, ['sku_export'], group='sku'),
+        Stage('article_export', export_article_data, group='article'),
+        Stage('article_rename', rename_article_files, ['article_export'], group='article'),
+        Stage('order', process_order_data),
+        Stage('stock', process_stock_data),
+        Stage('business_partner', process_business_partner_data),
+    ]
+
+def main(stages=None, workers=None):
+    """Run the selected stages (default: DEFAULT_STAGES) on up to workers threads"""
+    from src.config import DEFAULT_STAGES, PIPELINE_WORKERS
+    from src.pipeline import run_stages, print_timing_report
     try:
-        # Process SKU data
-        #process_sku_data()
-        # Process Article data
-        #process_article_data()
-        # Process Order data
-        #process_order_data()
-        # Process Stock Data
-        #process_stock_data()
-        # Process Business Partner Data
-        process_business_partner_data()
+        run = run_stages(build_stages(), stages or DEFAULT_STAGES, workers or PIPELINE_WORKERS)
+        print_timing_report(run)
+        failed = [info['error'] for info in run.values() if info['status'] == 'failed']
+        if failed:
+            raise failed[0]
         
         print("\nAll data processing completed successfully!")
     except Exception as e:
         print(f"Error: {e}")
         raise
+    finally:
+        from src.database import close_all_connections, print_connection_summary
+        from src.delta import delta_store
+        from src.output_manifest import output_manifest
+        from src.parallel import close_pool
+        from src.query_cache import query_cache
+        from src.query_stats import query_stats
+        query_stats.print_summary()
+        query_stats.write_report()
+        print_connection_summary()
+        query_cache.print_summary()
+        delta_store.print_summary()
+        output_manifest.print_summary()
+        output_manifest.write_run_manifest()
+        close_all_connections()
+        close_pool()
  
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the article importer.')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the persistent query-result cache')
+    parser.add_argument('--backend', choices=['access', 'sqlite'], help='Query backend (default: IMPORTER_BACKEND or access)')
+    parser.add_argument('--snapshot', action='store_true', help='Query the local snapshot (python -m src.snapshot), same as --backend sqlite')
+    parser.add_argument('--fetch-engine', choices=['pandas', 'arrow'], help='Result fetch engine (default: IMPORTER_FETCH_ENGINE or pandas)')
+    parser.add_argument('--stages', nargs='+', metavar='STAGE',
+                        help='Stages or groups to run, dependencies included: all, sku, article, order, stock, '
+                             'business_partner, or single stages like sku_rename (default: DEFAULT_STAGES in src/config.py)')
+    parser.add_argument('--workers', type=int, help='Stages running at the same time (default: PIPELINE_WORKERS)')
+    parser.add_argument('--transform-workers', type=int,
+                        help='Processes for text, classification and bank data transforms (default: IMPORTER_TRANSFORM_WORKERS or 1)')
+    parser.add_argument('--delta', action='store_true',
+                        help='Export only AIDs that are new or changed since the previous run (default: IMPORTER_DELTA=1)')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help='Keep files whose content matches the previous run from being moved into place and handed off; '
+                             'they are still written to a temporary file to compare (default: IMPORTER_SKIP_UNCHANGED=1)')
+    args = parser.parse_args()
+    if args.no_cache:
+        from src.query_cache import set_cache_enabled
+        set_cache_enabled(False)
+    if args.backend or args.snapshot:
+        from src.database import set_backend
+        set_backend(args.backend or 'sqlite')
+    if args.fetch_engine:
+        from src.database import set_fetch_engine
+        set_fetch_engine(args.fetch_engine)
+    if args.transform_workers:
+        from src.parallel import set_transform_workers
+        set_transform_workers(args.transform_workers)
+    if args.delta:
+        from src.delta import set_delta_enabled
+        set_delta_enabled(True)
+    if args.skip_unchanged:
+        from src.output_manifest import set_skip_unchanged
+        set_skip_unchanged(True)
+    main(args.stages, args.workers)
@@ -2,8 +2,17 @@
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
-from src.database import execute_query, save_fetcsv
+from src.database import execute_query, iter_query, save_fetcsv
 from src.config import OUTPUT_DIR, SQL_DIR
+from src.sql_registry import sql_registry
+from src.fetcsv import FetcsvWriter, number, date, schema_columns
+
+# Contract positions: price with decimal comma, valid_from as YYYYMMDD, formatted when written
+ORDER_POS_SCHEMA = [
+    ('txId', None), ('quantity', None), ('price', number()), ('aid', None), ('company', None), ('priceUnit', None),
+    ('supplier_id', None), ('factory', None), ('commodity_group_path', None), ('unit', None),
+    ('use_proc_unit_for_purchase', None), ('supplierAid', None), ('valid_from', date()), ('pos_text', None),
+]
 
 class OrderImporter:
     """
@@ -17,29 +26,43 @@ class OrderImporter:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def _load_query(self, filename):
-        """Helper to safely load SQL query from file"""
-        sql_path = self.sql_dir / filename
-        if not sql_path.exists():
-            print(f"Warning: SQL file not found at {sql_path}")
+        """Helper to get a parsed SQL query from the registry"""
+        template = sql_registry.get(filename)
+        if template is None:
+            print(f"Warning: SQL file not found at {self.sql_dir / filename}")
             return None
-        return sql_path.read_text(encoding='utf-8-sig').strip() # Using utf-8-sig as in original code
+        return template.text
 
     def _save_csv(self, df, filename, data_type="CONTRACT"):
-        """Standardized CSV export with FETCSV header"""
+        """Standardized CSV export with FETCSV header; None if nothing (new) was written"""
         if df is not None and not df.empty:
             out_path = self.output_dir / filename
-            save_fetcsv(df, out_path, data_type)
+            if save_fetcsv(df, out_path, data_type) == 'unchanged':
+                print(f"Unchanged: {out_path.name} ({len(df)} records), not handed off again")
+                return None
             print(f"Exported {len(df)} records to: {out_path}")
             return out_path
         return None
 
+    def _finish_writer(self, writer):
+        """Report a closed streamed export; None if it got no rows or is unchanged"""
+        if not writer.rows:
+            return None
+        if writer.status == 'unchanged':
+            print(f"Unchanged: {writer.path.name} ({writer.rows} records), not handed off again")
+            return None
+        print(f"Exported {writer.rows} records ({writer.bytes} bytes) to: {writer.path}")
+        return writer.path
+
     def _decode_clerk(self, val):
         return val.decode('utf-16-le') if isinstance(val, bytes) else str(val)
 
     def _create_empty_csv(self, filename, columns, data_type="CONTRACT"):
         """Creates an empty CSV file with headers if no data is found (as per original logic)"""
         out_path = self.output_dir / filename
-        save_fetcsv(pd.DataFrame(columns=columns), out_path, data_type)
+        if save_fetcsv(pd.DataFrame(columns=columns), out_path, data_type) == 'unchanged':
+            print(f"Unchanged: {out_path.name} (empty), not handed off again")
+            return None
         print(f"Created empty file: {out_path}")
         return out_path
 
@@ -87,13 +110,8 @@ class OrderImporter:
         df = df[[c for c in cols if c in df.columns]]
         return self._save_csv(df, "order_data.csv")
 
-    def import_order_pos(self):
-        query = self._load_query('get_orderpos.sql')
-        if not query: return None
-        
-        df = pd.DataFrame(execute_query(query))
-        if df.empty: return None
-
+    def _transform_order_pos(self, df):
+        """Row-local transformation of order positions, applied per chunk"""
         rename_map = {
             'OrderNr_Lang': 'txId', 'Menge': 'quantity',
             'OPreis': 'price', 'ArtikelCode': 'aid',
@@ -111,22 +129,21 @@ class OrderImporter:
             df[k] = v
 
         df['supplier_id'] = df['txId'].str[:5]
-        
-        if 'valid_from' in df.columns:
-            df['valid_from'] = df['valid_from'].dt.strftime("%Y%m%d")
-            
-        if 'price' in df.columns:
-            df['price'] = df['price'].astype(str).str.replace('.', ',', regex=False)
 
         if 'clerk' in df.columns:
             df['clerk'] = df['clerk'].apply(self._decode_clerk)
 
-        cols = ['txId', 'quantity', 'price', 'aid', 'company', 'priceUnit', 
-                'supplier_id', 'factory', 'commodity_group_path', 'unit', 
-                'use_proc_unit_for_purchase', 'supplierAid', 'valid_from', 'pos_text']
+        # price and valid_from are formatted by ORDER_POS_SCHEMA when the chunk is written
+        return df[[c for c in schema_columns(ORDER_POS_SCHEMA) if c in df.columns]]
+
+    def import_order_pos(self):
+        query = self._load_query('get_orderpos.sql')
+        if not query: return None
         
-        df = df[[c for c in cols if c in df.columns]]
-        return self._save_csv(df, "order_pos_data.csv")
+        with FetcsvWriter(self.output_dir / "order_pos_data.csv", "CONTRACT", ORDER_POS_SCHEMA) as writer:
+            for chunk in iter_query(query):
+                writer.write(self._transform_order_pos(chunk))
+        return self._finish_writer(writer)
 
     def import_order_are_15(self):
         # Almost identical to import_order but different SQL and file
@@ -169,48 +186,19 @@ class OrderImporter:
         return self._save_csv(df, "order_are_15_data.csv")
 
     def import_order_pos_are_15(self):
-        cols = ['txId', 'quantity', 'price', 'aid', 'company', 'priceUnit', 
-                'supplier_id', 'factory', 'commodity_group_path', 'unit', 
-                'use_proc_unit_for_purchase', 'supplierAid', 'valid_from', 'pos_text']
-        
+        cols = schema_columns(ORDER_POS_SCHEMA)
+
         query = self._load_query('get_orderpos_are_15.sql')
         if not query: 
             return self._create_empty_csv("order_pos_are_15_data.csv", cols)
             
-        df = pd.DataFrame(execute_query(query))
-        
-        if df.empty:
-            return self._create_empty_csv("order_pos_are_15_data.csv", cols)
+        with FetcsvWriter(self.output_dir / "order_pos_are_15_data.csv", "CONTRACT", ORDER_POS_SCHEMA) as writer:
+            for chunk in iter_query(query):
+                writer.write(self._transform_order_pos(chunk))
 
-        rename_map = {
-            'OrderNr_Lang': 'txId', 'Menge': 'quantity',
-            'OPreis': 'price', 'ArtikelCode': 'aid',
-            'erfaßt_am': 'valid_from'
-        }
-        df.rename(columns={k:v for k,v in rename_map.items() if k in df.columns}, inplace=True)
-        
-        # Defaults
-        defaults = {
-            'company': 1, 'priceUnit': 'Stk', 'factory': 'Düsseldorf',
-            'commodity_group_path': '', 'unit': 'Stk', 
-            'use_proc_unit_for_purchase': '0', 'supplierAid': '', 'pos_text': ''
-        }
-        for k, v in defaults.items():
-            df[k] = v
-            
-        df['supplier_id'] = df['txId'].str[:5]
-        
-        if 'price' in df.columns:
-            df['price'] = df['price'].astype(str).str.replace('.', ',', regex=False)
-            
-        if 'valid_from' in df.columns:
-            df['valid_from'] = df['valid_from'].dt.strftime("%Y%m%d")
-            
-        if 'clerk' in df.columns:
-             df['clerk'] = df['clerk'].apply(self._decode_clerk)
-             
-        df = df[[c for c in cols if c in df.columns]]
-        return self._save_csv(df, "order_pos_are_15_data.csv")
+        if not writer.rows:
+            return self._create_empty_csv("order_pos_are_15_data.csv", cols)
+        return self._finish_writer(writer)
 
     def import_order_classification(self):
         # 1. Export Pos Data (Reusing import_order_pos logic partially but query might be different? 
@@ -0,0 +1,182 @@
+"""
+Output files of a run: content hashes kept across runs and a run manifest.
+
+FetcsvWriter (and with it save_fetcsv, used by every importer's _save_csv)
+records each file it finishes: data type, rows, bytes, the SHA-256 of the
+file, the content hash, write time, the pipeline stage and the importer
+method that produced it. safe_rename in
+src.main adds the final name. After the run the list is written as
+data/reports/run_manifest_<start>.json for the ERP import and for reporting.
+
+sha256 is the hash of the delivered file's bytes, computed while it is
+written; the ERP import can check a file against it (sha256sum). For an
+unchanged file it is the hash of the file delivered by the previous run.
+
+The content hash is the writer's fingerprint, a SHA-256 over the rows; it
+depends on the dtypes and the pandas version and is only used to decide
+skip-unchanged, not to check a file.
+Each article export leaves its own run-date columns out of it: the SKU /
+article basis, EAN, text and price exports their valid_from (and the text
+validity columns), the validity price lists only valid_to, because their
+valid_from is read from Price_ERP.csv and a change to it must be delivered.
+So these files keep their hash from day to day as long as their data does
+not change. The hash of every written file is kept
+in data/cache/output_manifest.json. In skip-unchanged mode a file whose
+hash equals the one recorded by the previous run is not put in place
+again: the importers report it as unchanged and return no path, so the
+rename steps do not hand the same file to the ERP import a second time.
+The file is still written to a temporary name to compute the hash; only
+the replace and the hand-off are skipped:
+
+    python -m src.main --stages all --skip-unchanged
+
+Hashes are recorded in every run, so switching the mode on takes effect
+from the next run. An unchanged file keeps the run dates of the run that
+delivered it. All other exports (orders, stock, business partners) are
+compared on their full content; the valid_from of the order positions is
+the order date, not the run date.
+"""
+import os
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from src.config import OUTPUT_MANIFEST_FILE, REPORT_DIR, SKIP_UNCHANGED_OUTPUTS
+
+class OutputManifest:
+    """
+    Output path -> content hash, SHA-256, rows, size and final name of the last written
+    file (kept across runs), plus one entry per file finished in this run.
+    """
+
+    def __init__(self, path=OUTPUT_MANIFEST_FILE, skip_unchanged=SKIP_UNCHANGED_OUTPUTS):
+        self.path = path
+        self.skip_unchanged = skip_unchanged
+        self.started_at = datetime.now()
+        self.totals = {'written': 0, 'unchanged': 0}
+        self.files = []
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(out_path):
+        return str(Path(out_path).resolve())
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                print(f"Warning: Output manifest unreadable, writing all files: {e}")
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Output manifest not saved: {e}")
+
+    def is_unchanged(self, out_path, digest):
+        """True in skip-unchanged mode if the previous run wrote the same content to out_path"""
+        if not self.skip_unchanged:
+            return False
+        with self._lock:
+            entry = self._load().get(self._key(out_path))
+        return entry is not None and entry.get('hash') == digest
+
+    def record(self, out_path, status, rows, size, digest, sha256=None, data_type=None, seconds=None):
+        """Add a finished file ('written' or 'unchanged') to the run and store the hash of a written one"""
+        from src.pipeline import current_stage
+        from src.query_stats import calling_importer
+
+        out_path = Path(out_path)
+        key = self._key(out_path)
+        entry = {
+            'file': out_path.name,
+            'final_name': out_path.name,
+            'path': key,
+            'data_type': data_type,
+            'status': status,
+            'rows': rows,
+            'bytes': size,
+            'sha256': sha256,
+            'content_hash': digest,
+            'write_seconds': round(seconds, 4) if seconds is not None else None,
+            'stage': current_stage(),
+            'importer': calling_importer(public_only=True),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self._lock:
+            self.totals[status] += 1
+            previous = self._load().get(key, {})
+            if status == 'unchanged':
+                # left where the previous run delivered it, with that run's bytes
+                entry['final_name'] = previous.get('final_name', entry['final_name'])
+                entry['bytes'] = previous.get('bytes', entry['bytes'])
+                entry['sha256'] = previous.get('sha256')
+            self.files.append(entry)
+            if status != 'written':
+                return
+            self._entries[key] = {
+                'hash': digest, 'sha256': sha256, 'rows': rows, 'bytes': size, 'final_name': out_path.name,
+                'written_at': entry['finished_at'],
+            }
+            self._save()
+
+    def renamed(self, src, dst):
+        """Note the final name of a file moved by the rename steps"""
+        key, final_name = self._key(src), Path(dst).name
+        with self._lock:
+            for entry in reversed(self.files):
+                if entry['path'] == key:
+                    entry['final_name'] = final_name
+                    entry['path'] = self._key(dst)
+                    break
+            stored = self._load().get(key)
+            if stored is not None and stored.get('final_name') != final_name:
+                stored['final_name'] = final_name
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self.path.unlink(missing_ok=True)
+
+    def write_run_manifest(self, path=None):
+        """Write the files of this run as JSON; returns the path (None if no file was finished)"""
+        with self._lock:
+            files = list(self.files)
+            totals = dict(self.totals)
+        if not files:
+            return None
+        path = Path(path) if path else REPORT_DIR / f"run_manifest_{self.started_at:%Y%m%d_%H%M%S}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'skip_unchanged': self.skip_unchanged,
+            'totals': {**totals, 'rows': sum(f['rows'] for f in files), 'bytes': sum(f['bytes'] for f in files)},
+            'files': files,
+        }
+        path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"Run manifest written to: {path}")
+        return path
+
+    def print_summary(self):
+        if self.totals['unchanged']:
+            print(f"Output files: {self.totals['written']} written, "
+                  f"{self.totals['unchanged']} unchanged (not handed off again)")
+
+output_manifest = OutputManifest()
+
+def set_skip_unchanged(enabled):
+    """Switch skip-unchanged mode on or off (e.g. for --skip-unchanged)"""
+    output_manifest.skip_unchanged = enabled
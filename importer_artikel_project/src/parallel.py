@@ -0,0 +1,135 @@
+"""
+Process-pool execution for CPU-bound DataFrame transforms.
+
+Text cleaning, care-instruction tagging, classification building and
+IBAN/BIC resolution are pure Python per row, so threads do not help.
+shard_map splits a frame by a key column (AID, customer ID) into one shard
+per worker process, runs the transform on each shard and puts the results
+back into the original row order, so the output is the same as running the
+transform on the whole frame.
+
+Shards travel to and from the workers as Arrow IPC streams when every
+column survives the round trip unchanged (numbers, dates, strings without
+missing values); other frames are pickled.
+
+Off by default (1 worker). Enable with IMPORTER_TRANSFORM_WORKERS=8 or
+'python -m src.main --transform-workers 8'.
+"""
+import atexit
+import threading
+from src.config import TRANSFORM_WORKERS, TRANSFORM_MIN_ROWS
+
+_workers = TRANSFORM_WORKERS
+_executor = None
+_executor_lock = threading.Lock()
+
+def set_transform_workers(count):
+    """Number of worker processes for shard_map (1 runs every transform in-process)"""
+    global _workers
+    if count < 1:
+        raise ValueError(f"Transform workers must be at least 1, got {count}")
+    close_pool()
+    _workers = count
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            # spawn: the stage runner has threads (and open ODBC handles) that must not be forked
+            _executor = ProcessPoolExecutor(max_workers=_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+def close_pool():
+    """Shutdown hook: stop the worker processes"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+atexit.register(close_pool)
+
+def _arrow_safe(df, table):
+    """True if table converts back to exactly df's values and dtypes"""
+    import pyarrow as pa
+
+    if not df.columns.is_unique or not all(isinstance(c, str) for c in df.columns):
+        return False
+    for name, dtype in df.dtypes.items():
+        column = table.column(name)
+        if dtype == object and not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+            return False  # mixed Python objects
+        if dtype == object and column.null_count:
+            return False  # None and NaN would both come back as NaN
+    return True
+
+def _pack(df):
+    """DataFrame -> (format, payload, dtypes, index) for sending to another process"""
+    index = df.index
+    try:
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if _arrow_safe(df, table):
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return 'arrow', sink.getvalue().to_pybytes(), df.dtypes.to_dict(), index
+    except (ImportError, TypeError, ValueError, ArithmeticError):
+        pass  # pyarrow missing or a column Arrow cannot represent
+    return 'pickle', df, None, index
+
+def _unpack(packed):
+    fmt, payload, dtypes, index = packed
+    if fmt == 'pickle':
+        return payload
+    import pyarrow as pa
+    df = pa.ipc.open_stream(payload).read_all().to_pandas()
+    # pyarrow maps strings to the pandas string dtype; restore the original dtypes
+    changed = {name: dtype for name, dtype in dtypes.items() if df[name].dtype != dtype}
+    if changed:
+        df = df.astype(changed)
+    df.index = index
+    return df
+
+def _run_shard(func, packed):
+    """Worker side: unpack a shard, transform it, pack the result"""
+    return _pack(func(_unpack(packed)))
+
+def shard_map(func, df, key):
+    """
+    func(df) computed on up to TRANSFORM_WORKERS processes.
+
+    Rows with the same key value go to the same shard, so func may group or
+    de-duplicate by key. func must be a module-level function (workers import
+    it by name), return a DataFrame and keep the index labels of the rows it
+    returns (a row-wise map or filter). Small frames and 1 worker run func
+    directly.
+    """
+    if _workers <= 1 or len(df) < TRANSFORM_MIN_ROWS or key not in df.columns:
+        return func(df)
+
+    import numpy as np
+    import pandas as pd
+
+    labels = df.index
+    positional = df.set_axis(pd.RangeIndex(len(df)))
+    codes, _ = pd.factorize(positional[key])
+    shard_of = codes % _workers  # missing keys (-1) land in the last shard
+    parts = [positional[shard_of == i] for i in range(_workers)]
+
+    executor = _get_executor()
+    futures = [executor.submit(_run_shard, func, _pack(part)) for part in parts if not part.empty]
+    results = [_unpack(future.result()) for future in futures]
+
+    if any(not part.columns.equals(results[0].columns) for part in results):
+        raise ValueError(f"{getattr(func, '__name__', func)} returned different columns for different shards")
+    result = pd.concat(results)
+    # A column can be inferred differently per shard (e.g. all missing in one of them);
+    # infer those again on the whole result, as a single call of func would have done
+    mixed = [name for name in result.columns if len({str(part[name].dtype) for part in results}) > 1]
+    if mixed:
+        result[mixed] = result[mixed].infer_objects()
+    result = result.iloc[np.argsort(result.index.to_numpy(), kind='stable')]
+    return result.set_axis(labels[result.index.to_numpy()])
@@ -0,0 +1,160 @@
+"""
+Stage runner for src.main.
+
+Stages declare the stages they depend on; independent stages run
+concurrently on a bounded thread pool (the work is mostly waiting on the
+database and on file I/O). A stage receives the return values of its
+dependencies as arguments. When a stage fails, the stages depending on it
+are skipped and the others carry on. After the run a timing report shows
+when each stage ran and which chain of stages determined the wall time.
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+_running = threading.local()
+
+def current_stage():
+    """Name of the stage running on this thread (None outside run_stages)"""
+    return getattr(_running, 'stage', None)
+
+class Stage:
+    """A named unit of work with the names of the stages it depends on"""
+
+    def __init__(self, name, func, depends_on=(), group=None):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.group = group or name
+
+def resolve_stages(stages, selected):
+    """
+    Names of the stages to run, in dependency order: the selected stage or
+    group names plus everything they depend on.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    groups = {}
+    for stage in stages:
+        groups.setdefault(stage.group, []).append(stage.name)
+
+    wanted = []
+    for name in selected:
+        if name == 'all':
+            wanted.extend(by_name)
+        elif name in groups:
+            wanted.extend(groups[name])
+        elif name in by_name:
+            wanted.append(name)
+        else:
+            available = ['all', *groups, *(n for n in by_name if n not in groups)]
+            raise ValueError(f"Unknown stage '{name}' (available: {', '.join(available)})")
+
+    ordered = []
+    visiting = set()
+
+    def visit(name):
+        if name in ordered:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage dependency cycle at '{name}'")
+        visiting.add(name)
+        for dep in by_name[name].depends_on:
+            visit(dep)
+        visiting.discard(name)
+        ordered.append(name)
+
+    for name in wanted:
+        visit(name)
+    return ordered
+
+def run_stages(stages, selected, max_workers=1):
+    """
+    Run the selected stages (and their dependencies) as soon as their
+    dependencies are done, at most max_workers at a time.
+    
+    Returns:
+        dict: Per stage name: status ('ok', 'failed', 'skipped'), start and
+        end seconds relative to the run start, dependencies, result / error
+    """
+    by_name = {stage.name: stage for stage in stages}
+    order = resolve_stages(stages, selected)
+    run = {name: {'status': 'pending', 'start': None, 'end': None,
+                  'depends_on': by_name[name].depends_on, 'result': None, 'error': None}
+           for name in order}
+    run_start = time.perf_counter()
+    lock = threading.Lock()
+
+    def execute(name):
+        stage = by_name[name]
+        args = [run[dep]['result'] for dep in stage.depends_on]
+        with lock:
+            run[name]['start'] = time.perf_counter() - run_start
+        _running.stage = name
+        try:
+            return stage.func(*args)
+        finally:
+            _running.stage = None
+            with lock:
+                run[name]['end'] = time.perf_counter() - run_start
+
+    pending = list(order)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name in list(pending):
+                statuses = [run[dep]['status'] for dep in by_name[name].depends_on]
+                if any(status in ('failed', 'skipped') for status in statuses):
+                    run[name]['status'] = 'skipped'
+                    pending.remove(name)
+                    print(f"[SKIPPED] Stage {name}: a dependency did not complete")
+                elif all(status == 'ok' for status in statuses):
+                    run[name]['status'] = 'running'
+                    pending.remove(name)
+                    running[executor.submit(execute, name)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    run[name]['result'] = future.result()
+                    run[name]['status'] = 'ok'
+                except Exception as e:
+                    run[name]['error'] = e
+                    run[name]['status'] = 'failed'
+                    print(f"[ERROR] Stage {name} failed: {e}")
+    return run
+
+def critical_path(run):
+    """Chain of stages, each waiting on the latest-finishing dependency, ending at the last stage"""
+    finished = {name: info for name, info in run.items() if info['end'] is not None}
+    if not finished:
+        return []
+    name = max(finished, key=lambda n: finished[n]['end'])
+    path = [name]
+    while True:
+        deps = [dep for dep in finished[name]['depends_on'] if dep in finished]
+        if not deps:
+            break
+        name = max(deps, key=lambda n: finished[n]['end'])
+        path.append(name)
+    return path[::-1]
+
+def print_timing_report(run):
+    path = critical_path(run)
+    print("\n=== Stage Timing ===")
+    print(f"  {'stage':<18} {'status':<8} {'start':>8} {'end':>8} {'duration':>9}  depends on")
+    timed = sorted(run.items(), key=lambda item: (item[1]['start'] is None, item[1]['start'] or 0))
+    for name, info in timed:
+        marker = '*' if name in path else ' '
+        if info['start'] is None:
+            print(f"{marker} {name:<18} {info['status']:<8} {'-':>8} {'-':>8} {'-':>9}  {', '.join(info['depends_on'])}")
+            continue
+        duration = info['end'] - info['start']
+        print(f"{marker} {name:<18} {info['status']:<8} {info['start']:>7.2f}s {info['end']:>7.2f}s "
+              f"{duration:>8.2f}s  {', '.join(info['depends_on'])}")
+    if path:
+        wall = max(info['end'] for info in run.values() if info['end'] is not None)
+        busy = sum(info['end'] - info['start'] for info in run.values() if info['end'] is not None)
+        print(f"Critical path (*): {' -> '.join(path)}")
+        print(f"Wall time {wall:.2f}s, sum of stage times {busy:.2f}s")
@@ -0,0 +1,178 @@
+"""
+Price lists for the article export.
+
+All price lists come from a single fetch of get_article_price.sql (one row
+per AID and Staffel). price_matrix pivots it into a dense AID x Staffel
+matrix; basic price, Preisstaffel 1-3 / 2-3 and Preisstufe 3-7 are column
+selections and not-null masks on the price table or that matrix.
+
+The validity lists (prices of the ERP export that expire with this import)
+come from Price_ERP.csv, read once per run and shared by all three lists.
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+import pandas as pd
+from src.fetcsv import number, schema_columns
+
+# Staffel behind price[0], price[1], price[2] of each Preisstaffel list
+STAFFEL_PRICELISTS = {
+    'Preisstaffel 1-3': (1, 2, 3),
+    'Preisstaffel 2-3': (2, 2, 3),
+}
+STAFFEL_AMOUNTS = ['1', '100', '1000']
+PREISSTUFEN = range(3, 8)
+
+# (pricelist pattern in Price_ERP.csv, output file, Staffel layout)
+VALIDITY_LISTS = [
+    ("Private_", "PRICELIST_basicprice_validity.csv", False),
+    ("Preisstaffel", "PRICELIST_pricestaffeln_validity.csv", True),
+    ("Preisstufe", "PRICELIST_preisstufe3_7_validity.csv", False),
+]
+VALIDITY_RUN_DATE_COLUMNS = ['valid_to']  # valid_from comes from Price_ERP.csv, only valid_to is the run date
+
+# Output schemas (see src/fetcsv.py): prices stay floats until the file is written
+BASICPRICE_SCHEMA = [
+    ('aid', None), ('company', None), ('basicPrice', number()), ('currency', None), ('valid_from', None),
+    ('limitValidity', None), ('discountable', None), ('surchargeable', None), ('unit', None), ('use_default_sales_unit', None),
+]
+STAFFEL_SCHEMA = [
+    ('aid', None), ('company', None), ('currency', None), ('unit', None), ('pricelist', None), ('valid_from', None), ('limitValidity', None),
+    *[entry for i in range(3) for entry in [(f'price[{i}]', number()), (f'amountFrom[{i}]', None),
+                                            (f'discountable_idx[{i}]', None), (f'surchargeable_idx[{i}]', None)]],
+]
+STUFE_SCHEMA = [
+    ('aid', None), ('company', None), ('price', number()), ('currency', None), ('unit', None), ('pricelist', None),
+    ('valid_from', None), ('limitValidity', None), ('amountFrom', None), ('discountable_idx', None), ('surchargeable_idx', None),
+]
+
+def price_matrix(prices):
+    """Price table -> one row per AID (sorted), one column per Staffel, first price per cell"""
+    df = prices.rename(columns={'ArtikelCode': 'aid', 'Preis': 'price'})
+    return df.pivot_table(index='aid', columns='Staffel', values='price', aggfunc='first').reset_index()
+
+def _staffel(matrix, staffel):
+    if staffel in matrix.columns:
+        return matrix[staffel]
+    return pd.Series(float('nan'), index=matrix.index)
+
+def basic_prices(prices):
+    """Basispreis list: the first price row of every AID"""
+    df = prices[['ArtikelCode', 'Preis']].copy()
+    df['aid'] = df['ArtikelCode'].astype(str).str.strip()
+    df = df.drop_duplicates(subset=['aid'], keep='first')
+    df['company'] = '1'; df['currency'] = 'EUR'; df['valid_from'] = datetime.now().strftime("%Y%m%d"); df['limitValidity'] = '0'; df['discountable'] = 'J'; df['surchargeable'] = 'J'; df['unit'] = 'Stk'; df['use_default_sales_unit'] = 1
+    df['basicPrice'] = df['Preis']
+    return df[schema_columns(BASICPRICE_SCHEMA)]
+
+def staffel_prices(matrix):
+    """Preisstaffel lists: every AID with a price in one of the list's Staffeln, list by list"""
+    parts = []
+    for pricelist, staffeln in STAFFEL_PRICELISTS.items():
+        columns = [_staffel(matrix, staffel) for staffel in staffeln]
+        part = pd.DataFrame({'aid': matrix['aid'], 'pricelist': pricelist}, index=matrix.index)
+        for i, column in enumerate(columns):
+            part[f'price[{i}]'] = column
+        parts.append(part[pd.concat(columns, axis=1).notna().any(axis=1)])
+    fdf = pd.concat(parts, ignore_index=True)
+    fdf['company'] = '1'; fdf['currency'] = 'EUR'; fdf['unit'] = 'Stk'; fdf['valid_from'] = datetime.now().strftime("%Y%m%d"); fdf['limitValidity'] = '0'
+
+    for i in range(3):
+        fdf[f'amountFrom[{i}]'] = STAFFEL_AMOUNTS[i]
+        fdf[f'discountable_idx[{i}]'] = 'J'
+        fdf[f'surchargeable_idx[{i}]'] = 'J'
+    return fdf[schema_columns(STAFFEL_SCHEMA)]
+
+def stufe_prices(matrix):
+    """Preisstufe 3-7 lists: one row per AID with a price in that Staffel, Stufe by Stufe"""
+    parts = []
+    for i in PREISSTUFEN:
+        if i not in matrix.columns:
+            continue
+        price = matrix[i][matrix[i].notna()]
+        parts.append(pd.DataFrame({
+            'aid': matrix['aid'][price.index],
+            'price': price,
+            'pricelist': f'Preisstufe {i}',
+        }))
+    if not parts:
+        return pd.DataFrame()
+    fdf = pd.concat(parts, ignore_index=True)
+    fdf['company'] = '1'; fdf['currency'] = 'EUR'; fdf['unit'] = 'Stk'; fdf['valid_from'] = datetime.now().strftime("%Y%m%d"); fdf['limitValidity'] = '0'; fdf['discountable_idx'] = 'J'; fdf['surchargeable_idx'] = 'J'; fdf['amountFrom'] = '1'
+    return fdf[schema_columns(STUFE_SCHEMA)]
+
+def load_erp_prices(path):
+    """Active, non-obsolete rows of Price_ERP.csv (None if the file is missing); cached until the file changes"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return _read_erp_prices(path, path.stat().st_mtime_ns)
+
+@lru_cache(maxsize=1)
+def _read_erp_prices(path, mtime_ns):
+    df = pd.read_csv(path, sep=';', header=0, dtype=str)
+    df.columns = [col.lower() for col in df.columns]
+    if 'data' in df.columns:
+        df = df.rename(columns={'data': 'pricelist'})
+
+    if 'aid' in df.columns:
+        df = df[~df['aid'].str.contains('_obsolet', case=False, na=False)]
+    df = df[df['aktiv'] == 'ja'].copy()
+
+    if 'price' in df.columns:
+        df['price_value'] = pd.to_numeric(df['price'].str.replace(',', '.', regex=False), errors='coerce')
+    return df
+
+def _validity_rows(erp, type_filter):
+    df = erp[erp['pricelist'].str.contains(type_filter, regex=True, na=False)].copy()
+    df['company'] = '1'; df['currency'] = 'EUR'; df['unit'] = 'Stk'; df['limitValidity'] = '0'
+    df['valid_to'] = (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')
+    # parsed per list: a date that does not parse only resets the valid_from of its own list
+    try:
+        df['valid_from'] = pd.to_datetime(df['valid_from']).dt.strftime('%Y%m%d')
+    except Exception:
+        df['valid_from'] = datetime.now().strftime('%Y%m%d')
+    return df
+
+def validity_prices(erp, type_filter):
+    """Validity list with one price per ERP row (basic price, Preisstufe)"""
+    df = _validity_rows(erp, type_filter)
+    if 'price' in df.columns:
+        df['price'] = df['price'].astype(str).str.replace('.', ',', regex=False)
+    if 'basicprice' in df.columns:
+        df['basicPrice'] = df['basicprice'].astype(str).str.replace('.', ',', regex=False)
+
+    df['discountable_idx'] = 'J'; df['surchargeable_idx'] = 'J'; df['amountFrom'] = '1'
+    df['discountable'] = 'J'; df['surchargeable'] = 'J'; df['use_default_sales_unit'] = 1
+
+    if 'basicPrice' in df.columns:
+        cols = ['aid', 'company', 'basicPrice', 'currency', 'valid_from', 'valid_to', 'limitValidity', 'discountable', 'surchargeable', 'unit', 'use_default_sales_unit']
+    else:
+        cols = ['aid', 'company', 'price', 'currency', 'unit', 'pricelist', 'valid_from', 'valid_to', 'limitValidity', 'amountFrom', 'discountable_idx', 'surchargeable_idx']
+    return df[[c for c in cols if c in df.columns]]
+
+def staffel_validity(erp, type_filter="Preisstaffel"):
+    """
+    Validity list with one row per (aid, pricelist): the first ERP row of the
+    pair plus its three highest prices, highest first (fewer prices repeat the lowest)
+    """
+    keys = ['aid', 'pricelist']
+    df = _validity_rows(erp, type_filter).dropna(subset=keys)
+    rows = df.drop_duplicates(subset=keys).sort_values(keys, kind='stable').set_index(keys)
+
+    ranked = df.sort_values(keys + ['price_value'], ascending=[True, True, False], kind='stable')
+    ranked['rank'] = ranked.groupby(keys).cumcount()
+    top = (ranked[ranked['rank'] < 3]
+           .pivot(index=keys, columns='rank', values='price_value')
+           .reindex(index=rows.index, columns=range(3))
+           .ffill(axis=1))
+
+    for i in range(3):
+        rows[f'price[{i}]'] = top[i].map(str).str.replace('.', ',', regex=False)
+        rows[f'amountFrom[{i}]'] = STAFFEL_AMOUNTS[i]
+        rows[f'discountable_idx[{i}]'] = 'J'
+        rows[f'surchargeable_idx[{i}]'] = 'J'
+
+    cols = ['aid', 'company', 'pricelist', 'valid_from', 'valid_to', 'currency', 'unit', 'limitValidity']
+    for i in range(3): cols.extend([f'price[{i}]', f'amountFrom[{i}]', f'discountable_idx[{i}]', f'surchargeable_idx[{i}]'])
+    return rows.reset_index()[cols]
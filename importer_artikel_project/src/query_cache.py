@@ -0,0 +1,129 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from pathlib import Path
+from src.config import CACHE_DIR, CACHE_MAX_BYTES
+
+class QueryCache:
+    """
+    Persistent cache of query results stored as Parquet files.
+    Entries are keyed by the normalized SQL text, the parameters and a
+    fingerprint (size, mtime, content hash) of the source MDB file, so any
+    change to the database snapshot invalidates them automatically.
+    Least recently used entries are evicted once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        self._parquet_checked = False
+
+    def _parquet_available(self):
+        if not self._parquet_checked:
+            self._parquet_checked = True
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                print("Warning: pyarrow not installed, query cache disabled")
+                self.enabled = False
+        return self.enabled
+
+    def _file_fingerprint(self, mdb_path):
+        """Size, mtime and SHA-1 of the MDB file, hashed once per file state"""
+        stat = mdb_path.stat()
+        state = (str(mdb_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._fingerprints.get(state)
+        if digest is None:
+            sha1 = hashlib.sha1()
+            with open(mdb_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    sha1.update(block)
+            digest = sha1.hexdigest()
+            with self._lock:
+                self._fingerprints[state] = digest
+        return [stat.st_size, stat.st_mtime_ns, digest]
+
+    @staticmethod
+    def _normalize_sql(query):
+        return re.sub(r'\s+', ' ', query).strip()
+
+    def _entry_path(self, query, params, mdb_path, variant=None):
+        parts = [
+            self._normalize_sql(query),
+            repr(params),
+            self._file_fingerprint(mdb_path),
+        ]
+        if variant:
+            # e.g. the fetch engine, whose frames have different dtypes
+            parts.append(variant)
+        key = json.dumps(parts)
+        return self.cache_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.parquet"
+
+    def get(self, query, params, mdb_path, variant=None):
+        """Return the cached DataFrame or None"""
+        if not self.enabled or not self._parquet_available():
+            return None
+        try:
+            path = self._entry_path(query, params, Path(mdb_path), variant)
+            if not path.exists():
+                self.misses += 1
+                return None
+            import pandas as pd
+            df = pd.read_parquet(path)
+            os.utime(path)  # mark as recently used for LRU eviction
+            self.hits += 1
+            return df
+        except Exception as e:
+            print(f"Warning: Query cache read failed: {e}")
+            return None
+
+    def put(self, query, params, mdb_path, df, variant=None):
+        if not self.enabled or not self._parquet_available():
+            return
+        try:
+            path = self._entry_path(query, params, Path(mdb_path), variant)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            self._evict()
+        except Exception as e:
+            # Frames with mixed object columns cannot always be stored as Parquet
+            print(f"Warning: Query result not cached: {e}")
+
+    def _evict(self):
+        entries = []
+        for p in self.cache_dir.glob('*.parquet'):
+            try:
+                stat = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for p in self.cache_dir.glob('*.parquet'):
+            p.unlink(missing_ok=True)
+
+    def print_summary(self):
+        if self.hits or self.misses:
+            print(f"Query cache: {self.hits} hit(s), {self.misses} miss(es)")
+
+query_cache = QueryCache()
+
+def set_cache_enabled(enabled):
+    """Switch the persistent query cache on or off (e.g. for --no-cache)"""
+    query_cache.enabled = enabled
@@ -0,0 +1,172 @@
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+from src.config import REPORT_DIR
+
+class TimedCursor:
+    """Cursor wrapper that adds execute and fetch durations to a timings dict"""
+
+    def __init__(self, cursor, timings):
+        self._cursor = cursor
+        self._timings = timings
+
+    def _timed(self, key, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self._timings[key] += time.perf_counter() - start
+
+    def execute(self, *args):
+        self._timed('execute', self._cursor.execute, *args)
+        return self
+
+    def fetchall(self):
+        return self._timed('fetch', self._cursor.fetchall)
+
+    def fetchmany(self, *args):
+        return self._timed('fetch', self._cursor.fetchmany, *args)
+
+    def fetchone(self):
+        return self._timed('fetch', self._cursor.fetchone)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)  # e.g. arraysize
+
+class TimedConnection:
+    """Connection wrapper handing out TimedCursors (e.g. to pd.read_sql)"""
+
+    def __init__(self, conn, timings):
+        self._conn = conn
+        self._timings = timings
+
+    def cursor(self):
+        return TimedCursor(self._conn.cursor(), self._timings)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def new_timings():
+    return {'connect': 0.0, 'execute': 0.0, 'fetch': 0.0}
+
+def frame_memory(df, sample=1000):
+    """Approximate memory of a DataFrame; object columns are estimated from a sample"""
+    total = int(df.memory_usage(index=True, deep=False).sum())
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].iloc[:sample]
+        if len(values):
+            avg = sum(sys.getsizeof(v) for v in values) / len(values)
+            total += int(avg * len(df))
+    return total
+
+def calling_importer(skip=2, public_only=False):
+    """'Class.method' of the nearest importer method on the call stack (public_only: skip _helpers)"""
+    frame = sys._getframe(skip)
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if (owner is not None and type(owner).__name__.endswith('Importer')
+                and not (public_only and frame.f_code.co_name.startswith('_'))):
+            return f"{type(owner).__name__}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+class QueryStats:
+    """
+    Per-execution query metrics for one run: SQL file, parameter and batch
+    counts, connect / execute / fetch seconds, rows, columns and approximate
+    frame memory. Collected by the data layer, reported as JSON and as a
+    console summary of the hottest SQL files.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.records = []
+        self.started_at = datetime.now()
+        self._lock = threading.Lock()
+
+    def record(self, sql_file, timings, rows=0, columns=0, memory_bytes=0, params=None,
+               batch=None, caller=None, cached=False, backend=None, engine=None):
+        if not self.enabled:
+            return
+        entry = {
+            'sql_file': sql_file,
+            'caller': caller,
+            'backend': backend,
+            'engine': engine,
+            'params': len(params) if params else 0,
+            'batch': batch[0] if batch else 1,
+            'batches': batch[1] if batch else 1,
+            'cached': cached,
+            'connect_seconds': round(timings['connect'], 4),
+            'execute_seconds': round(timings['execute'], 4),
+            'fetch_seconds': round(timings['fetch'], 4),
+            'rows': rows,
+            'columns': columns,
+            'memory_bytes': memory_bytes,
+        }
+        with self._lock:
+            self.records.append(entry)
+
+    def summary(self):
+        """Records aggregated per SQL file, slowest first"""
+        totals = {}
+        for r in self.records:
+            t = totals.setdefault(r['sql_file'], {
+                'sql_file': r['sql_file'], 'callers': set(), 'executions': 0, 'cached': 0,
+                'connect_seconds': 0.0, 'execute_seconds': 0.0, 'fetch_seconds': 0.0,
+                'rows': 0, 'memory_bytes': 0})
+            if r['caller']:
+                t['callers'].add(r['caller'])
+            t['executions'] += 1
+            t['cached'] += r['cached']
+            for key in ('connect_seconds', 'execute_seconds', 'fetch_seconds', 'rows', 'memory_bytes'):
+                t[key] += r[key]
+        result = []
+        for t in totals.values():
+            t['callers'] = sorted(t['callers'])
+            t['total_seconds'] = round(t['connect_seconds'] + t['execute_seconds'] + t['fetch_seconds'], 4)
+            result.append(t)
+        return sorted(result, key=lambda t: t['total_seconds'], reverse=True)
+
+    def write_report(self, path=None):
+        """Write all records plus the per-file summary as JSON; returns the path"""
+        if not self.records:
+            return None
+        path = Path(path) if path else REPORT_DIR / f"query_report_{self.started_at:%Y%m%d_%H%M%S}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'summary': self.summary(),
+            'queries': self.records,
+        }
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"Query report written to: {path}")
+        return path
+
+    def print_summary(self, top=15):
+        rows = self.summary()
+        if not rows:
+            return
+        print("\n=== Query Summary ===")
+        print(f"{'SQL file':<40} {'runs':>5} {'rows':>9} {'connect':>8} {'execute':>8} {'fetch':>8} {'total':>8} {'MB':>8}")
+        for t in rows[:top]:
+            print(f"{t['sql_file'][:40]:<40} {t['executions']:>5} {t['rows']:>9} "
+                  f"{t['connect_seconds']:>7.2f}s {t['execute_seconds']:>7.2f}s {t['fetch_seconds']:>7.2f}s "
+                  f"{t['total_seconds']:>7.2f}s {t['memory_bytes'] / 1e6:>8.1f}")
+        if len(rows) > top:
+            print(f"... {len(rows) - top} more SQL file(s) in the JSON report")
+
+query_stats = QueryStats()
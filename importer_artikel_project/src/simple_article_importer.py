@@ -290,8 +290,6 @@ if __name__ == "__main__":
     art_importer.import_artikel_variant()
     
     # Pricing
-    art_importer.import_artikel_pricestaffeln()
-    art_importer.import_artikel_preisstufe_3_7()
-    art_importer.import_artikel_basicprice()
+    art_importer.import_artikel_prices()
 
     print("Import completed.")
@@ -1,7 +1,8 @@
+from functools import lru_cache
+from pathlib import Path
 import pandas as pd
-import pyodbc
 from src.config import OUTPUT_DIR, MDB_DATA
-from src.database import read_csv_file, save_fetcsv
+from src.database import execute_query, read_csv_file, save_fetcsv
 
 def extract_color(sku):
     if not isinstance(sku, str):
@@ -13,11 +14,65 @@ def extract_color(sku):
         return color_part.lower()
     return None
 
+def rewrite_sku_colors(skus, color_map):
+    """
+    SKUs with the colour segment replaced by its ERP colour, in one pass.
+
+    'A100-Navy/White-XL' becomes 'A100-<ERP colour of navy>-XL'; colours not
+    in color_map keep their spelling but lose the '/...' suffix. SKUs with
+    fewer than three '-' parts and missing values are returned unchanged.
+    """
+    # object dtype: split/strip/lower run on Python strings, exactly like the str methods
+    skus = skus.astype(object)
+    try:
+        parts = skus.str.split('-', n=2, expand=True)
+    except AttributeError:
+        return skus  # no text values at all (e.g. numeric AIDs)
+    if parts.shape[1] < 3:
+        return skus
+
+    # The colour work runs once per distinct colour segment, there are only a few dozen
+    codes, segments = pd.factorize(parts[1])
+    color_part = pd.Series(segments, dtype=object).str.split('/', n=1).str[0].str.strip()
+    temp_color = color_part.str.lower()
+    new_color = temp_color.map(color_map)
+    new_color = new_color.where(new_color.notna(), temp_color)
+    replacement = color_part.where(temp_color == new_color, new_color).str.replace('-', '', regex=False)
+
+    segment = pd.Series(replacement.to_numpy(dtype=object)[codes], index=skus.index)
+    valid = (codes >= 0) & new_color.notna().to_numpy()[codes] & parts[2].notna().to_numpy()
+    rewritten = parts[0] + '-' + segment + '-' + parts[2]
+    return rewritten.where(valid, skus)
+
+COLOR_QUERY = """
+    SELECT a.ERP_Farben, MID(a.FarbName, 4) AS ewFarben
+    FROM tArtFarben AS a
+    WHERE a.isExport = TRUE
+"""
+
+def load_color_map(mdb_path=MDB_DATA):
+    """
+    ewFarben -> ERP_Farben from tArtFarben; queried once per run, again only after the MDB file changed.
+    None if the table cannot be read (warned once, SKUs are then exported unconverted)
+    """
+    path = Path(mdb_path)
+    stat = path.stat() if path.exists() else None  # sqlite backend: the MDB itself may not be there
+    return _read_color_map(path, stat and (stat.st_size, stat.st_mtime_ns))
+
+@lru_cache(maxsize=1)
+def _read_color_map(path, file_state):
+    # the failure is cached as well, so a missing or locked MDB gives one warning, not one per file
+    try:
+        color_map_df = execute_query(COLOR_QUERY, mdb_path=path)
+        return color_map_df.set_index('ewFarben')['ERP_Farben'].to_dict()
+    except Exception as e:
+        print(f"Warning: Could not load SKU colours from {path.name}, exporting SKUs unconverted: {e}")
+        return None
+
 def process_colors(csv_file_path=None, sku_column='aid', data_type="ARTICLE"):
     if csv_file_path is None:
         csv_file_path = OUTPUT_DIR / "skus.csv"
-        
-    conn_str = f"DRIVER={{Microsoft Access Driver (*.mdb, *.accdb)}};DBQ={MDB_DATA};"
+
 
     try:
         # Read original data using the FET-aware reader
@@ -26,15 +81,9 @@ def process_colors(csv_file_path=None, sku_column='aid', data_type="ARTICLE"):
         # Get original column order
         original_columns = original_df.columns.tolist()
         
-        with pyodbc.connect(conn_str) as conn:
-            color_query = """
-                SELECT a.ERP_Farben, MID(a.FarbName, 4) AS ewFarben
-                FROM tArtFarben AS a
-                WHERE a.isExport = TRUE
-            """
-            color_map_df = pd.read_sql(color_query, conn)
-
-        color_map = color_map_df.set_index('ewFarben')['ERP_Farben'].to_dict()
+        color_map = load_color_map()
+        if color_map is None:
+            raise ValueError("colour map (tArtFarben) not available")
         
         sku_column_name = sku_column if sku_column else 'aid'
         
@@ -43,33 +92,8 @@ def process_colors(csv_file_path=None, sku_column='aid', data_type="ARTICLE"):
             # but usually it's passed correctly
             raise ValueError(f"Column '{sku_column_name}' not found in the CSV file")
 
-        # Create a copy for processing
-        sku_df = original_df.copy()
-        sku_df['temp_color'] = sku_df[sku_column_name].apply(extract_color)
-        sku_df['new_color'] = sku_df['temp_color'].map(color_map).fillna(sku_df['temp_color'])
-        
-        def process_sku(row):
-            if not isinstance(row[sku_column_name], str) or pd.isna(row['temp_color']) or pd.isna(row['new_color']):
-                return row[sku_column_name]
-                
-            parts = row[sku_column_name].split('-')
-            if len(parts) < 3:
-                return row[sku_column_name]
-                
-            color_part = parts[1].split('/')[0].strip()
-            
-            if row['temp_color'] != row['new_color']:
-                color_part = row['new_color']
-                
-            # Remove all hyphens from the color part
-            parts[1] = color_part.replace('-', '')
-            return '-'.join(parts)
-            
-        # Update SKU column
-        sku_df[sku_column_name] = sku_df.apply(process_sku, axis=1)
-        
-        # Remove temporary columns
-        result_df = sku_df.drop(columns=['temp_color', 'new_color'], errors='ignore')
+        result_df = original_df.copy()
+        result_df[sku_column_name] = rewrite_sku_colors(original_df[sku_column_name], color_map)
         
         # Maintain original column order
         result_df = result_df[original_columns]
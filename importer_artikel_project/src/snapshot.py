@@ -0,0 +1,187 @@
+"""
+Local snapshot of the Access source tables.
+
+Extracts every table referenced in sql/*.sql once into one SQLite file per
+MDB (data/snapshot/<mdb>.sqlite) plus a manifest, so dev reruns can query
+the snapshot instead of going through the Access ODBC driver:
+
+    python -m src.snapshot                 # (re)create the snapshot
+    python -m src.main --backend sqlite    # run the importers against it
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+import pandas as pd
+from src.config import MDB_FILE, MDB_DATA, SNAPSHOT_DIR
+
+MANIFEST_FILE = SNAPSHOT_DIR / "manifest.json"
+
+# Tables queried from Python code rather than from sql/*.sql
+EXTRA_TABLES = ['tArtFarben']
+
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)[\s(]+(?:\[([^\]]+)\]|([A-Za-z_]\w*))', re.IGNORECASE)
+
+def referenced_tables():
+    """Table names used after FROM / JOIN in the SQL files"""
+    from src.sql_registry import sql_registry
+
+    names = set(EXTRA_TABLES)
+    for sql_file in sql_registry.names():
+        for match in _TABLE_PATTERN.finditer(sql_registry.get(sql_file).text):
+            name = match.group(1) or match.group(2)
+            if name.upper() != 'SELECT':
+                names.add(name)
+    return sorted(names, key=str.lower)
+
+def snapshot_path(mdb_path, directory=None):
+    return Path(directory or SNAPSHOT_DIR) / f"{Path(mdb_path).stem}.sqlite"
+
+# --- Access function shims for queries running on the snapshot ---
+
+def _mid(value, start, length=None):
+    if value is None or start is None:
+        return None
+    value = str(value)
+    start = int(start) - 1
+    return value[start:] if length is None else value[start:start + int(length)]
+
+def _left(value, length):
+    return None if value is None else str(value)[:int(length)]
+
+def _right(value, length):
+    if value is None:
+        return None
+    length = int(length)
+    return str(value)[-length:] if length > 0 else ''
+
+def _cstr(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _nz(value, default=''):
+    return default if value is None else value
+
+def _format(value, pattern):
+    """Numeric zero-padding formats like Format(x, '0000')"""
+    if value is None:
+        return None
+    if pattern and set(pattern) == {'0'}:
+        return f"{int(value):0{len(pattern)}d}"
+    return str(value)
+
+def _val(value):
+    match = re.match(r'\s*[-+]?\d*\.?\d+', str(value or ''))
+    return float(match.group()) if match else 0.0
+
+ACCESS_FUNCTIONS = {
+    # LEFT/RIGHT are SQLite keywords; src.sql_dialect renames the calls
+    'MID': (_mid, -1), 'ACCESS_LEFT': (_left, 2), 'ACCESS_RIGHT': (_right, 2), 'CSTR': (_cstr, 1),
+    'NZ': (_nz, -1), 'FORMAT': (_format, 2), 'VAL': (_val, 1),
+    'UCASE': (lambda v: None if v is None else str(v).upper(), 1),
+    'LCASE': (lambda v: None if v is None else str(v).lower(), 1),
+    'LEN': (lambda v: None if v is None else len(str(v)), 1),
+}
+
+def connect_snapshot(mdb_path, directory=None):
+    """Open the snapshot of an MDB file with the Access function shims registered"""
+    path = snapshot_path(mdb_path, directory)
+    if not path.exists():
+        raise FileNotFoundError(f"No SQLite copy of {Path(mdb_path).name} at {path}, run 'python -m src.snapshot' first")
+    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    for name, (func, n_args) in ACCESS_FUNCTIONS.items():
+        conn.create_function(name, n_args, func, deterministic=True)
+    return conn
+
+def check_snapshot(mdb_path):
+    """Warn when the MDB file changed after the snapshot was taken"""
+    if not MANIFEST_FILE.exists() or not Path(mdb_path).exists():
+        return
+    manifest = json.loads(MANIFEST_FILE.read_text(encoding='utf-8'))
+    entry = manifest.get('sources', {}).get(Path(mdb_path).name)
+    stat = Path(mdb_path).stat()
+    if entry and (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+        print(f"Warning: Snapshot of {Path(mdb_path).name} is older than the MDB file (taken {manifest['created_at']})")
+
+# --- Extraction ---
+
+def _to_sqlite_value(value):
+    """Keep Access semantics: Yes/No as -1/0; currency Decimals as floats"""
+    if isinstance(value, bool):
+        return -1 if value else 0
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def _to_sqlite_frame(df):
+    for col in df.columns:
+        if df[col].dtype == bool:
+            df[col] = df[col].astype(int) * -1
+        elif df[col].dtype == object:
+            df[col] = df[col].map(_to_sqlite_value)
+    return df
+
+def _source_objects(conn):
+    """Tables, linked tables and saved queries of an MDB file, by lower-case name"""
+    cursor = conn.cursor()
+    try:
+        return {row.table_name.lower(): row.table_name for row in cursor.tables()
+                if row.table_type in ('TABLE', 'SYNONYM', 'VIEW')}
+    finally:
+        cursor.close()
+
+def create_snapshot(mdb_paths=(MDB_FILE, MDB_DATA), tables=None):
+    """Extract the referenced tables of each MDB file into its SQLite snapshot"""
+    from src.database import get_pool
+
+    tables = tables or referenced_tables()
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = {'created_at': datetime.now().isoformat(timespec='seconds'), 'sources': {}}
+
+    for mdb_path in map(Path, mdb_paths):
+        if not mdb_path.exists():
+            print(f"Warning: MDB file not found at {mdb_path}")
+            continue
+        stat = mdb_path.stat()
+        target = snapshot_path(mdb_path)
+        tmp_target = target.with_suffix('.sqlite.tmp')
+        tmp_target.unlink(missing_ok=True)
+        entry = {'mdb': str(mdb_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'snapshot': target.name, 'tables': {}}
+
+        print(f"\n=== Snapshot {mdb_path.name} ===")
+        with get_pool(mdb_path, backend='access').connection() as conn, closing(sqlite3.connect(tmp_target)) as out:
+            available = _source_objects(conn)
+            for name in tables:
+                source_name = available.get(name.lower())
+                if source_name is None:
+                    continue
+                start = time.perf_counter()
+                df = pd.read_sql(f"SELECT * FROM [{source_name}]", conn)
+                _to_sqlite_frame(df).to_sql(source_name, out, index=False)
+                elapsed = time.perf_counter() - start
+                entry['tables'][source_name] = {'rows': len(df), 'columns': list(df.columns), 'seconds': round(elapsed, 3)}
+                print(f"{source_name}: {len(df)} rows in {elapsed:.2f}s")
+            out.commit()
+        os.replace(tmp_target, target)
+        manifest['sources'][mdb_path.name] = entry
+
+    MANIFEST_FILE.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"\nSnapshot manifest written to: {MANIFEST_FILE}")
+    return manifest
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Extract the Access source tables into a local SQLite snapshot.')
+    parser.add_argument('--tables', nargs='*', help='Only these tables (default: all tables referenced in sql/*.sql)')
+    args = parser.parse_args()
+    create_snapshot(tables=args.tables)
@@ -0,0 +1,86 @@
+"""
+Translation of Access (Jet/ACE) SQL into the SQLite dialect.
+
+Only the constructs used by the queries in sql/ and src/ are covered:
+bracketed identifiers, double-quoted string literals, TRUE/FALSE, '&' and
+string '+' concatenation, #date# literals, TOP n, DISTINCTROW, and the
+LEFT()/RIGHT()/Now()/Date() functions. Other Access functions (MID, CStr, Nz,
+Format, ...) are provided as SQLite user functions by src.snapshot.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+_DATE_LITERAL = re.compile(r"#([^#\n]+)#")
+_TOP = re.compile(r"\bSELECT(\s+DISTINCT)?\s+TOP\s+(\d+)\b", re.IGNORECASE)
+
+def _protect_literals(sql):
+    """Replace string literals with placeholders so rewrites never touch them"""
+    literals = []
+
+    def keep(match):
+        text = match.group()
+        if text.startswith('"'):
+            # Access treats "..." as a string literal, SQLite as an identifier
+            text = "'" + text[1:-1].replace('""', '"').replace("'", "''") + "'"
+        literals.append(text)
+        return f"\x00{len(literals) - 1}\x00"
+
+    return _LITERAL.sub(keep, sql), literals
+
+def _restore_literals(sql, literals):
+    return _PLACEHOLDER.sub(lambda m: literals[int(m.group(1))], sql)
+
+def _date_literal(match):
+    text = match.group(1).strip()
+    for fmt in ('%m/%d/%Y %H:%M:%S', '%m/%d/%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            value = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return "'" + value.strftime('%Y-%m-%d %H:%M:%S' if ':' in text else '%Y-%m-%d') + "'"
+    return match.group()
+
+def _top_to_limit(sql):
+    """SELECT TOP n ... becomes SELECT ... LIMIT n at the end of the same (sub)query"""
+    while True:
+        match = _TOP.search(sql)
+        if not match:
+            return sql
+        depth = 0
+        end = len(sql)
+        for i in range(match.end(), len(sql)):
+            if sql[i] == '(':
+                depth += 1
+            elif sql[i] == ')':
+                if depth == 0:
+                    end = i
+                    break
+                depth -= 1
+        head = sql[:match.start()] + 'SELECT' + (match.group(1) or '')
+        body = sql[match.end():end].rstrip()
+        semicolon = body.endswith(';')
+        body = body.rstrip(';').rstrip()
+        sql = f"{head}{body} LIMIT {match.group(2)}{';' if semicolon else ''}{sql[end:]}"
+
+@lru_cache(maxsize=256)
+def translate_access_sql(sql):
+    """Rewrite an Access SQL statement so SQLite executes it with the same meaning"""
+    sql, literals = _protect_literals(sql)
+    sql = _DATE_LITERAL.sub(_date_literal, sql)
+    sql = re.sub(r"\[([^\]]+)\]", lambda m: '"' + m.group(1).replace('"', '""') + '"', sql)
+    sql = re.sub(r"\bTRUE\b", "-1", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bFALSE\b", "0", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bDISTINCTROW\b", "DISTINCT", sql, flags=re.IGNORECASE)
+    sql = sql.replace('&', '||')
+    # '+' next to a string literal is Access string concatenation
+    sql = re.sub(r"\+\s*(?=\x00)", "|| ", sql)
+    sql = re.sub(r"(\x00\d+\x00)\s*\+", r"\1 ||", sql)
+    sql = re.sub(r"\bLEFT\s*\(", "ACCESS_LEFT(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bRIGHT\s*\(", "ACCESS_RIGHT(", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bNow\s*\(\s*\)", "datetime('now', 'localtime')", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bDate\s*\(\s*\)", "date('now', 'localtime')", sql, flags=re.IGNORECASE)
+    sql = _top_to_limit(sql)
+    return _restore_literals(sql, literals)
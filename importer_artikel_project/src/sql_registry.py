@@ -0,0 +1,137 @@
+"""
+Registry of the SQL templates in sql/.
+
+The directory is scanned once per run; every file is parsed once into a
+template (comment lines removed, BOM and surrounding whitespace stripped,
+{placeholder} names and '-- @types' column declarations recorded). Rendered statements are memoized per set of
+placeholder values, so repeated stage calls do neither file I/O nor string
+reprocessing. Files are re-parsed when their mtime changes; the directory is
+re-checked at most every SQL_RECHECK_SECONDS.
+"""
+import os
+import re
+import time
+import threading
+from pathlib import Path
+from src.config import SQL_DIR, SQL_RECHECK_SECONDS
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_TYPES = re.compile(r"^\s*--\s*@types\s+(.+)$", re.MULTILINE)
+
+class SqlTemplate:
+    """One parsed SQL file, split into literal text and placeholder segments"""
+
+    MAX_RENDERED = 32
+
+    def __init__(self, path, text, mtime_ns):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.mtime_ns = mtime_ns
+        # Declared result column types ('-- @types aid=string, Preis=float64'), see src.arrow_fetch
+        self.column_types = {}
+        for declaration in _TYPES.findall(text):
+            for item in declaration.split(','):
+                column, _, type_name = item.partition('=')
+                if column.strip() and type_name.strip():
+                    self.column_types[column.strip()] = type_name.strip()
+        self.text = '\n'.join(line for line in text.strip().split('\n')
+                              if not line.strip().startswith('--'))
+        # Even indexes are literal text, odd indexes placeholder names
+        self._segments = _PLACEHOLDER.split(self.text)
+        self.placeholders = tuple(dict.fromkeys(self._segments[1::2]))
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    def render(self, **values):
+        """Statement text with the given placeholders filled in (others are left as they are)"""
+        if not values or not self.placeholders:
+            return self.text
+        key = tuple(sorted(values.items()))
+        with self._lock:
+            statement = self._rendered.get(key)
+        if statement is not None:
+            return statement
+        parts = list(self._segments)
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            parts[i] = str(values[name]) if name in values else '{' + name + '}'
+        statement = ''.join(parts)
+        with self._lock:
+            if len(self._rendered) >= self.MAX_RENDERED:
+                self._rendered.pop(next(iter(self._rendered)))
+            self._rendered[key] = statement
+        return statement
+
+class SqlRegistry:
+    """Parsed SQL templates of a directory, keyed by file name"""
+
+    MAX_NAMED_STATEMENTS = 1024
+
+    def __init__(self, sql_dir=SQL_DIR, recheck_seconds=SQL_RECHECK_SECONDS):
+        self.sql_dir = Path(sql_dir)
+        self.recheck_seconds = recheck_seconds
+        self.loads = 0
+        self._templates = None
+        self._names = {}
+        self._rendered_names = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self, path, mtime_ns):
+        self.loads += 1
+        return SqlTemplate(path, path.read_text(encoding='utf-8-sig'), mtime_ns)
+
+    def _scan(self):
+        """Pick up new, changed and deleted files (only parses what changed)"""
+        old = self._templates or {}
+        templates = {}
+        with os.scandir(self.sql_dir) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith('.sql') or not entry.is_file():
+                    continue
+                mtime_ns = entry.stat().st_mtime_ns
+                template = old.get(entry.name)
+                if template is None or template.mtime_ns != mtime_ns:
+                    template = self._load(Path(entry.path), mtime_ns)
+                templates[entry.name] = template
+        self._templates = templates
+        self._names = {template.text: name for name, template in templates.items()}
+        self._checked_at = time.monotonic()
+
+    def _templates_current(self):
+        with self._lock:
+            if self._templates is None or time.monotonic() - self._checked_at > self.recheck_seconds:
+                self._scan()
+            return self._templates
+
+    def names(self):
+        return sorted(self._templates_current())
+
+    def get(self, name):
+        """Template for a file name in the SQL directory, or None if there is no such file"""
+        return self._templates_current().get(name)
+
+    def statement(self, name, **values):
+        """Prepared statement text of a SQL file with placeholders filled in"""
+        template = self.get(name)
+        if template is None:
+            raise FileNotFoundError(f"SQL file not found: {self.sql_dir / name}")
+        statement = template.render(**values)
+        if values and statement not in self._rendered_names:
+            with self._lock:
+                if len(self._rendered_names) >= self.MAX_NAMED_STATEMENTS:
+                    self._rendered_names.pop(next(iter(self._rendered_names)))
+                self._rendered_names[statement] = name
+        return statement
+
+    def name_of(self, statement):
+        """SQL file a statement handed out by this registry came from (None if unknown)"""
+        return self._names.get(statement) or self._rendered_names.get(statement)
+
+    def clear(self):
+        with self._lock:
+            self._templates = None
+            self._names = {}
+            self._rendered_names = {}
+
+sql_registry = SqlRegistry()
@@ -1,8 +1,10 @@
 
-import pandas as pd
+from contextlib import ExitStack
 from pathlib import Path
-from src.database import execute_query, save_fetcsv
+from src.database import iter_query_by_keys, save_fetcsv
+from src.fetcsv import FetcsvWriter
 from src.config import OUTPUT_DIR, SQL_DIR
+from src.sql_registry import sql_registry
 
 class StockImporter:
     """
@@ -27,37 +29,66 @@ class StockImporter:
         return list(areas) if isinstance(areas, set) else areas
 
     def _load_query(self, filename):
-        """Helper to safely load SQL query from file"""
-        sql_path = self.sql_dir / filename
-        if not sql_path.exists():
-            print(f"Warning: SQL file not found at {sql_path}")
+        """Helper to get a parsed SQL query from the registry"""
+        template = sql_registry.get(filename)
+        if template is None:
+            print(f"Warning: SQL file not found at {self.sql_dir / filename}")
             return None
-        return sql_path.read_text(encoding='utf-8')
+        return template.text
 
     def _save_csv(self, df, filename, data_type="STOCK"):
-        """Standardized CSV export with FETCSV header"""
+        """Standardized CSV export with FETCSV header; None if nothing (new) was written"""
         if df is not None and not df.empty:
             out_path = self.output_dir / filename
-            save_fetcsv(df, out_path, data_type)
+            if save_fetcsv(df, out_path, data_type) == 'unchanged':
+                print(f"Unchanged: {out_path.name} ({len(df)} records), not handed off again")
+                return None
             print(f"Exported {len(df)} records to: {out_path}")
             return out_path
         return None
 
+    def _finish_writer(self, writer):
+        """Report a closed streamed export; None if it got no rows or is unchanged"""
+        if not writer.rows:
+            return None
+        if writer.status == 'unchanged':
+            print(f"Unchanged: {writer.path.name} ({writer.rows} records), not handed off again")
+            return None
+        print(f"Exported {writer.rows} records ({writer.bytes} bytes) to: {writer.path}")
+        return writer.path
+
     def import_stock_lager(self):
         """Import stock data and generate 3 output files."""
-        query_template = self._load_query('get_lager.sql')
-        if not query_template:
+        if not self._load_query('get_lager.sql'):
             return None, None, None
 
         # Prepare parameters
         params = ['Kommissionierungslager', -1]
         
         # Add area filter logic
-        # Note: Filtering happens in Python to avoid SQL parameter limits with large lists
-        sql_query = query_template.format(diff_areas_filter="")
+        # Note: diff_areas are joined via a staged key table instead of SQL
+        # parameters (parameter limits); the Python filter stays as fallback
+        sql_query = sql_registry.statement('get_lager.sql', diff_areas_filter="")
+        
+        if self.diff_areas and len(self.diff_areas) > 0:
+            print(f"Filtering {len(self.diff_areas)} areas")
         
-        # Execute query
-        df = pd.DataFrame(execute_query(sql_query, params))
+        # Stream the query; every transformation below is row-local
+        files = ("STOCK - Lager.csv",
+                 "STOCKARTICLE_PRIORITY_AREA - Prioritätsplätze.csv",
+                 "Stockarticle_LocDef-Stellplatzdefinitionen.csv")
+        area_expr = "q.Reihe & '-' & q.Regal & '-' & Format(q.Palette, '0000')"
+        with ExitStack() as stack:
+            writers = [stack.enter_context(FetcsvWriter(self.output_dir / filename, "STOCK")) for filename in files]
+            for chunk in iter_query_by_keys(sql_query, self.diff_areas, area_expr, params):
+                for writer, part in zip(writers, self._transform_stock_chunk(chunk)):
+                    writer.write(part)
+
+        file1, file2, file3 = (self._finish_writer(writer) for writer in writers)
+        return file1, file2, file3
+
+    def _transform_stock_chunk(self, df):
+        """Filter and shape one chunk of stock rows into the three output frames"""
         if df.empty:
             return None, None, None
 
@@ -69,7 +100,6 @@ class StockImporter:
 
         # Apply diff_areas filter in Python
         if self.diff_areas and len(self.diff_areas) > 0:
-            print(f"Filtering {len(self.diff_areas)} areas")
             df['area_lower'] = df['area'].str.lower()
             valid_areas_lower = {str(area).lower() for area in self.diff_areas}
             df = df[df['area_lower'].isin(valid_areas_lower)]
@@ -92,14 +122,12 @@ class StockImporter:
         # 1. Main Stock File
         main_columns = ['location', 'factory', 'area', 'is_priority_area']
         main_output_columns = [col for col in main_columns if col in df.columns]
-        
-        file1 = self._save_csv(df[main_output_columns], "STOCK - Lager.csv")
+        main_df = df[main_output_columns]
 
         # 2. Priority Area File
         priority_cols = ['aid', 'area', 'company', 'factory', 'location']
         # Selecting and reordering
         priority_df = df[priority_cols].copy()
-        file2 = self._save_csv(priority_df, "STOCKARTICLE_PRIORITY_AREA - Prioritätsplätze.csv")
 
         # 3. Location Definition File
         loc_def_cols = [
@@ -107,6 +135,5 @@ class StockImporter:
             'quantity', 'refilPoint', 'refilPointIsPercent', 'unit'
         ]
         loc_def_df = df[loc_def_cols].copy()
-        file3 = self._save_csv(loc_def_df, "Stockarticle_LocDef-Stellplatzdefinitionen.csv")
 
-        return file1, file2, file3
+        return main_df, priority_df, loc_def_df
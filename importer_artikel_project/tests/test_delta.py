@@ -0,0 +1,47 @@
+"""
+Delta mode leaves the run-date columns of an export out of its AID hashes,
+but only those: the valid_from of the validity price lists comes from
+Price_ERP.csv, so a change to it alone must still be exported.
+
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.delta import DeltaStore
+from src.pricing import VALIDITY_RUN_DATE_COLUMNS
+
+@pytest.fixture
+def store(tmp_path):
+    pytest.importorskip('pyarrow')
+    return DeltaStore(state_dir=tmp_path, enabled=True)
+
+def validity_rows(valid_from, valid_to):
+    return pd.DataFrame({'aid': ['A1', 'A2'], 'price': ['1,5', '2,5'],
+                         'valid_from': valid_from, 'valid_to': [valid_to] * 2})
+
+def test_validity_list_erp_valid_from_change_is_exported(store):
+    filename = "PRICELIST_basicprice_validity.csv"
+    first, hashes = store.select(validity_rows(['20250301', '20250301'], '20261016'), filename, VALIDITY_RUN_DATE_COLUMNS)
+    store.commit(filename, hashes)
+
+    # next day: valid_to moved with the run date, A2's valid_from changed in the ERP
+    delta, _ = store.select(validity_rows(['20250301', '20250401'], '20261017'), filename, VALIDITY_RUN_DATE_COLUMNS)
+
+    assert len(first) == 2
+    assert delta['aid'].tolist() == ['A2']
+
+def test_run_date_valid_from_change_is_not_exported(store):
+    filename = "sku_basis.csv"
+    rows = pd.DataFrame({'aid': ['A1', 'A2'], 'name': ['Shirt', 'Cap']})
+    _, hashes = store.select(rows.assign(valid_from='20261016'), filename)
+    store.commit(filename, hashes)
+
+    delta, _ = store.select(rows.assign(valid_from='20261017'), filename)
+
+    assert delta.empty
@@ -0,0 +1,52 @@
+"""
+The run manifest's sha256 is the hash of the delivered file's bytes, so the
+ERP import can check a file against it; the content fingerprint is only
+for skip-unchanged.
+
+    python -m pytest tests
+"""
+import sys
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.fetcsv import FetcsvWriter
+from src.output_manifest import output_manifest
+
+@pytest.fixture
+def manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_manifest, 'path', tmp_path / "output_manifest.json")
+    monkeypatch.setattr(output_manifest, '_entries', None)
+    monkeypatch.setattr(output_manifest, 'files', [])
+    monkeypatch.setattr(output_manifest, 'totals', {'written': 0, 'unchanged': 0})
+    return output_manifest
+
+def write_stock(path, run_date):
+    rows = pd.DataFrame({'aid': ['A1', 'Ä2'], 'stock': [1.5, 2.0], 'valid_from': run_date})
+    with FetcsvWriter(path, "STOCK", volatile_columns=['valid_from']) as writer:
+        writer.write(rows.iloc[:1])
+        writer.write(rows.iloc[1:])
+    return writer
+
+def file_sha256(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def test_sha256_is_hash_of_written_bytes(manifest, tmp_path):
+    writer = write_stock(tmp_path / "stock.csv", '20261017')
+
+    assert writer.sha256 == file_sha256(tmp_path / "stock.csv")
+    assert manifest.files[-1]['sha256'] == writer.sha256
+    assert manifest.files[-1]['content_hash'] == writer.digest != writer.sha256
+
+def test_unchanged_file_keeps_delivered_sha256(manifest, tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, 'skip_unchanged', True)
+    write_stock(tmp_path / "stock.csv", '20261016')
+
+    writer = write_stock(tmp_path / "stock.csv", '20261017')
+
+    assert writer.status == 'unchanged'
+    assert manifest.files[-1]['sha256'] == file_sha256(tmp_path / "stock.csv") != writer.sha256
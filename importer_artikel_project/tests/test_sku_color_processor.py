@@ -0,0 +1,52 @@
+"""
+The SKU colour rewrite is best-effort: when tArtFarben cannot be read
+(DATEN.MDB missing or locked, no table in the snapshot) the SKU exports
+are written with unconverted SKUs after one warning.
+
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src import sku_color_processor
+from src.article_importer_class import ArticleImporter
+from src.database import read_csv_file
+from src.output_manifest import output_manifest
+
+@pytest.fixture
+def unreadable_colors(monkeypatch):
+    """execute_query failing like a locked DATEN.MDB; returns the list of attempted queries"""
+    calls = []
+
+    def failing_query(query, **kwargs):
+        calls.append(query)
+        raise Exception("Error executing query: database is locked")
+
+    monkeypatch.setattr(sku_color_processor, 'execute_query', failing_query)
+    sku_color_processor._read_color_map.cache_clear()
+    yield calls
+    sku_color_processor._read_color_map.cache_clear()
+
+def test_load_color_map_warns_once_and_returns_none(unreadable_colors, tmp_path, capsys):
+    mdb = tmp_path / "DATEN.MDB"
+    assert sku_color_processor.load_color_map(mdb) is None
+    assert sku_color_processor.load_color_map(mdb) is None
+
+    assert len(unreadable_colors) == 1
+    assert capsys.readouterr().out.count("Warning: Could not load SKU colours") == 1
+
+def test_sku_export_written_unconverted(unreadable_colors, tmp_path, monkeypatch):
+    monkeypatch.setattr(output_manifest, 'path', tmp_path / "output_manifest.json")
+    importer = ArticleImporter(diff=[], diff1=[], rewrite_colors=True)
+    importer.output_dir = tmp_path
+    df = pd.DataFrame({'aid': ['A100-Navy/White-XL', 'A200-Red-M'], 'company': ['1', '1']})
+
+    out_path = importer._save_csv(df, "sku_basis.csv")
+
+    assert out_path == tmp_path / "sku_basis.csv"
+    assert read_csv_file(out_path, dtype=str)['aid'].tolist() == ['A100-Navy/White-XL', 'A200-Red-M']